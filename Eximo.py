@@ -1,5 +1,7 @@
 import copy
 from board import *
+from bitboard import *
+from zobrist import ZOBRIST, PIECE_KEYS
 import sys
 
 
@@ -36,6 +38,48 @@ it is called.
 
 '''
 
+# Board representations that can back an Eximo state
+BOARD_BACKENDS = {'matrix': Board, 'bitboard': BitBoard}
+
+'''
+
+Compact moves
+
+. A move is everything a player does in one turn (an ordinary-move, a chain of jumps or captures, and the pieces added if the moved piece reached
+the opposite side). It is represented by a tuple of packed tiles, where a packed tile is the integer (row - 1) * 8 + (column - 1) (the bit index
+used by BitBoard).
+. For moves, jumps and captures the tuple is the path of the piece (start tile followed by every tile it lands on), followed by the tiles where
+pieces were added, if any. For add-piece states it only has the tiles where pieces are added.
+
+'''
+
+def pack_tile(coords):
+    return (coords[1] - 1) * 8 + coords[0] - 1
+
+def unpack_tile(tile):
+    return INDEX_COORDS[tile]
+
+'''
+
+Chain cache
+
+. Different capture orders, or chains started by different pieces, may end in the same position. exec_all_moves and iter_moves only keep the
+first outcome of each final position (positions are compared with Eximo.get_key).
+. A ChainCache memoizes, during a search, the outcomes of every chain state (a state where the same player must keep jumping, capturing or
+adding pieces), keyed by its board, pending piece and flag, so a chain reached again from another node is not expanded twice. It also counts
+the duplicated outcomes that were removed.
+
+'''
+
+class ChainCache:
+
+    def __init__(self):
+        self.outcomes = {}          # Chain state key -> outcome states (exec_all_moves)
+        self.moves = {}             # Chain state key -> (remaining tiles, final position key) pairs (iter_moves)
+        self.hits = 0
+        self.misses = 0
+        self.duplicates = 0
+
 class Eximo:
 
     # Board elements
@@ -50,15 +94,44 @@ class Eximo:
     ADDPIECE_1 = 3      # Next op is add (1 left)
     ADDPIECE_2 = 4      # Next op is add (2 left)
 
-    def __init__(self, curr_player = 1, next_move = 0, next_pieces = set(), board = Board()):
+    # Piece-addition settings of the bot (see iter_add_placements)
+    ADD_ORDERING = True         # Order the placements by add_piece_score
+    ADD_PRUNING = 'none'        # 'none', 'mirror', 'back_row' or 'all'
+
+    # States are kept by the thousands during a search, so they don't have an instance dictionary
+    __slots__ = ('board', 'curr_player', 'next_move', 'pieces_mask', 'last_piece', 'message')
+
+    def __init__(self, curr_player = 1, next_move = 0, next_pieces = 0, board = Board()):
 
         self.board = board
         self.curr_player = curr_player          # Next player that may play
         self.next_move = next_move              # Value of gamestate flag
-        self.next_pieces = next_pieces          # Next valid start tiles
+        self.next_pieces = next_pieces          # Next valid start tiles (a set of tiles or its bitmask)
         self.last_piece = None                  # Last tile moved
         self.message = ""                       # Next op is add (1 left)
 
+    @property
+    def next_pieces(self):
+
+        """
+        Next valid start tiles, as a set of (x,y) tiles. They are stored as the bitmask pieces_mask (see bitboard.coords_to_mask), so the set is
+        built on every access and changing it doesn't change the state
+        """
+
+        return mask_to_coords(self.pieces_mask)
+
+    @next_pieces.setter
+    def next_pieces(self, tiles):
+        self.pieces_mask = tiles if isinstance(tiles, int) else coords_to_mask(tiles)
+
+    def is_next_piece(self, piece):
+
+        """
+        Check if the tile is one of the next valid start tiles
+        """
+
+        return self.pieces_mask & (1 << ((piece[1] - 1) * 8 + piece[0] - 1)) != 0
+
 
     def get_direction(self):
         """
@@ -95,12 +168,12 @@ class Eximo:
         """
 
         # Start of new state constrution
-        next_gs_board = Board.from_binary_matrix(self.board)
+        next_gs_board = self.board.copy()
         next_gs_board.set_element(newPieceCoords[0], newPieceCoords[1], self.curr_player)
         next_gs_board.remove_element(oldPieceCoords[0], oldPieceCoords[1])
         next_gs_next_player = self.curr_player
         next_gs_next_move = self.FREE
-        next_gs_next_pieces = set()
+        next_gs_next_pieces = 0
 
         new_gs = Eximo(next_gs_next_player,next_gs_next_move,next_gs_next_pieces,next_gs_board)
         new_gs.last_piece = newPieceCoords
@@ -314,7 +387,7 @@ class Eximo:
             return False
 
         # Check if the piece is in the next pieces (deals with obligatory jumps)
-        if(self.next_move == self.JUMP and  piece not in self.next_pieces):
+        if(self.next_move == self.JUMP and not self.is_next_piece(piece)):
             return False
 
         return True
@@ -331,12 +404,12 @@ class Eximo:
         """
 
         # Start of new state constrution
-        next_gs_board = Board.from_binary_matrix(self.board)
+        next_gs_board = self.board.copy()
         next_gs_board.set_element(newPieceCoords[0], newPieceCoords[1], self.curr_player)
         next_gs_board.remove_element(oldPieceCoords[0], oldPieceCoords[1])
         next_gs_next_player =  self.curr_player
         next_gs_next_move = self.FREE
-        next_gs_next_pieces = set()
+        next_gs_next_pieces = 0
 
 
         new_gs = Eximo(next_gs_next_player,next_gs_next_move,next_gs_next_pieces,next_gs_board)
@@ -578,7 +651,7 @@ class Eximo:
             return False
 
         # Check if the piece is in the next pieces (deals with obligatory captures)
-        if(self.next_move == self.CAPT and len(self.next_pieces) != 0 and piece not in self.next_pieces):
+        if(self.next_move == self.CAPT and self.pieces_mask != 0 and not self.is_next_piece(piece)):
             return False
 
         return True
@@ -596,13 +669,13 @@ class Eximo:
         """
 
         # Start of new state constrution
-        next_gs_board = Board.from_binary_matrix(self.board)
+        next_gs_board = self.board.copy()
         next_gs_board.set_element(newPieceCoords[0], newPieceCoords[1], self.curr_player)
         next_gs_board.remove_element(oldPieceCoords[0], oldPieceCoords[1])
         next_gs_board.remove_element(capturedPieceCoords[0], capturedPieceCoords[1])
         next_gs_next_player = self.curr_player
         next_gs_next_move = self.FREE
-        next_gs_next_pieces = set()
+        next_gs_next_pieces = 0
 
         new_gs = Eximo(next_gs_next_player,next_gs_next_move,next_gs_next_pieces,next_gs_board)
 
@@ -997,10 +1070,10 @@ class Eximo:
         """
 
         # Start of new state constrution
-        next_gs_board = Board.from_binary_matrix(self.board)
+        next_gs_board = self.board.copy()
         next_gs_board.set_element(newPieceCoords[0], newPieceCoords[1], self.curr_player)
         next_gs_next_player = self.get_enemy(self.curr_player)
-        next_gs_next_pieces = set()
+        next_gs_next_pieces = 0
         next_gs_next_move = self.FREE
 
         new_gs = Eximo(next_gs_next_player,next_gs_next_move,next_gs_next_pieces,next_gs_board)
@@ -1009,8 +1082,7 @@ class Eximo:
         if self.next_move == self.ADDPIECE_2:
             new_gs.next_move = self.ADDPIECE_1
             new_gs.curr_player = self.curr_player
-            new_gs.next_pieces = { piece for piece in self.next_pieces }
-            new_gs.next_pieces.remove(newPieceCoords)
+            new_gs.next_pieces = self.pieces_mask ^ coords_to_bit(newPieceCoords)
         elif self.next_move == self.ADDPIECE_1:
             new_gs.next_move = self.FREE
 
@@ -1029,29 +1101,20 @@ class Eximo:
             ret -> False if piece can't jump or resulting state
         """
         children = []
-        empty_pos = list(newPieceCoords)
 
         next_p = self.get_enemy(self.curr_player)
         next_move = self.FREE
 
-        if len(empty_pos) == 1:
-            board = Board.from_binary_matrix(self.board)
-            board.set_element(empty_pos[0][0], empty_pos[0][1], self.curr_player)
-            child = Eximo(next_p, next_move, set(), board)
+        for placement in self.iter_add_placements(newPieceCoords):
+            board = self.board.copy()
+
+            for pos in placement:
+                board.set_element(pos[0], pos[1], self.curr_player)
+
+            child = Eximo(next_p, next_move, 0, board)
             child.perform_checkup()
             children.append(child)
 
-        for idx, pos1 in enumerate(empty_pos):
-            curr_children = []
-            for pos2 in empty_pos[idx+1:]:
-                board = Board.from_binary_matrix(self.board)
-                board.set_element(pos1[0], pos1[1], self.curr_player)
-                board.set_element(pos2[0], pos2[1], self.curr_player)
-                child = Eximo(next_p, next_move, set(), board)
-                child.perform_checkup()
-                curr_children.append(child)
-            children.extend(curr_children)
-
         return children
 
     def op_add_piece(self, position):
@@ -1162,6 +1225,64 @@ class Eximo:
 
         return result
 
+    def iter_add_placements(self, tiles=None):
+
+        '''
+        Generator of the ways the bot may add its pieces (two pieces at once, or one if there is a single viable tile). Placements are ordered by
+        add_piece_score if ADD_ORDERING is set and the following ones are skipped, depending on ADD_PRUNING:
+
+            mirror    -> the mirror image of another placement, if the board is symmetric (both lead to equivalent positions)
+            back_row  -> placements with a piece on the back row while the tile in front of it, in the same column, is left empty. This
+                         is a lossy heuristic, not a dominance relation: a back-row piece may block a jump or keep a capture threat, so
+                         the best placement can be skipped
+
+        'all' skips both, so it is lossy as well.
+
+            tiles -> viable tiles (the next valid positions of the state by default)
+
+            ret -> tuples with the tile(s) where pieces are added
+        '''
+
+        tiles = list(self.next_pieces if tiles is None else tiles)
+
+        if len(tiles) == 1:
+            yield (tiles[0],)
+            return
+
+        placements = [(pos1, pos2) for idx, pos1 in enumerate(tiles) for pos2 in tiles[idx+1:]]
+
+        if self.ADD_ORDERING:
+            placements.sort(key=lambda placement: self.add_piece_score(placement[0]) + self.add_piece_score(placement[1]), reverse=True)
+
+        skip_mirrors = self.ADD_PRUNING in ('mirror', 'all') and self.board.is_mirror_symmetric()
+        skip_back_row = self.ADD_PRUNING in ('back_row', 'all')
+
+        free = set(tiles)
+        front_row = 7 if self.curr_player == self.PLAYER1 else 2
+
+        for placement in placements:
+
+            # Only the mirror image that comes first is kept
+            if skip_mirrors and sorted((9 - x, y) for (x, y) in placement) < sorted(placement):
+                continue
+
+            if skip_back_row and any(y != front_row and (x, front_row) in free and (x, front_row) not in placement for (x, y) in placement):
+                continue
+
+            yield placement
+
+    def add_piece_score(self, tile):
+
+        '''
+        Cheap static score of adding a piece of the current player to the tile: tiles on the front row (the one closest to the enemy) come first,
+        then the ones closest to the center
+        '''
+
+        front_row = 7 if self.curr_player == self.PLAYER1 else 2
+        score = 10 if tile[1] == front_row else 0
+
+        return score - abs(2 * tile[0] - 9)
+
     def get_enemy(self, player):
 
         '''
@@ -1248,6 +1369,25 @@ class Eximo:
 
         return can_capture, other_init
 
+    def must_capture(self):
+
+        '''
+        Check if the current player has to capture (mandatory capture of a FREE state or CAPT state), without changing the flags
+
+        ret -> True if the player has to capture, False otherwise
+        '''
+
+        if self.next_move == self.CAPT:
+            return True
+
+        if self.next_move != self.FREE:
+            return False
+
+        if isinstance(self.board, BitBoard):
+            return self.board.capture_sources(self.curr_player) != 0
+
+        return any(self.can_capture(piece) for piece in self.board.pieces(self.curr_player))
+
     def perform_full_checkup(self):
         '''
         Store valid next pieces for the current state. Check for mandatory captures
@@ -1257,7 +1397,7 @@ class Eximo:
         if self.next_move != self.FREE:
 
             # Except for when a add-piece state has no valid tiles where to put pieces. Reset state to free and do checkup
-            if (self.next_move == self.ADDPIECE_1 or self.next_move == self.ADDPIECE_2) and len(self.next_pieces) == 0:
+            if (self.next_move == self.ADDPIECE_1 or self.next_move == self.ADDPIECE_2) and self.pieces_mask == 0:
                 self.next_move = self.FREE
                 self.curr_player = self.get_enemy(self.curr_player)
             else:
@@ -1288,7 +1428,7 @@ class Eximo:
         if self.next_move != self.FREE:
 
             # Except for when a add-piece state has no valid tiles where to put pieces. Reset state to free and do checkup
-            if (self.next_move == self.ADDPIECE_1 or self.next_move == self.ADDPIECE_2) and len(self.next_pieces) == 0:
+            if (self.next_move == self.ADDPIECE_1 or self.next_move == self.ADDPIECE_2) and self.pieces_mask == 0:
                 self.next_move = self.FREE
                 self.curr_player = self.get_enemy(self.curr_player)
             else:
@@ -1322,18 +1462,26 @@ class Eximo:
         self.board.print_board(f)
         print('\n CURR_PLAYER: {}  NEXT_MOVE: {}  NEXT_PIECES: {} \n'.format(self.curr_player,self.next_move,self.next_pieces,self.message),file=f)
 
-    def exec_all_moves(self,level=0):
+    def exec_all_moves(self,level=0,chain_cache=None):
 
         """
-        Get an array with all possible outcomes from the current state (for a resultant state that is obtained by executing several jumps/captures only the final state is returned)
+        Get an array with all possible outcomes from the current state (for a resultant state that is obtained by executing several jumps/captures only the final state is returned).
+        Outcomes with the same final position are only returned once.
+
+            chain_cache -> optional ChainCache used to memoize the chains of jumps/captures/piece additions and count the removed duplicates
 
             ret -> array of all possible outcome states
         """
 
+        # Bitboards generate the operations for all the pieces at once
+        if isinstance(self.board, BitBoard):
+            return self.exec_all_moves_bitboard(level, chain_cache)
+
         capts = [self.op_capture_north, self.op_capture_nwest, self.op_capture_neast, self.op_capture_east, self.op_capture_west]
         jmps = [self.op_jump_north, self.op_jump_nwest, self.op_jump_neast]
         moves = [self.op_move_north,self.op_move_nwest, self.op_move_neast]
         result = []
+        seen = set()                # Keys of the outcomes that may be repeated
         ops = []
 
         # Pre-select all operations that may be executed
@@ -1344,6 +1492,7 @@ class Eximo:
             if len(capturingStarts) > 0:
                 self.next_move = self.CAPT
                 self.next_pieces = capturingStarts
+                ops = capts
             else:
                 self.next_move = self.FREE
                 jmps.extend(moves)
@@ -1371,13 +1520,630 @@ class Eximo:
                     # If the next player is the current player than the function is called recursevely, this is done so that outcomes account for successive plays by the same
                     # player ( successive jumps and captures or piece addition)
                     if newState.curr_player != self.curr_player:
-                        result.append(newState)
+
+                        # A single operation that leaves the moved piece on the board can't end in the same position as any other outcome
+                        if newState.board.get_element(newState.last_piece[0], newState.last_piece[1]) == self.curr_player:
+                            result.append(newState)
+                        else:
+                            self.add_outcomes([newState], result, seen, chain_cache)
                     else:
-                        result.extend(newState.exec_all_moves(level+1))
+                        self.add_outcomes(newState.expand_chain(level+1, chain_cache), result, seen, chain_cache)
+
+
+        return result
+
+    def expand_chain(self, level, chain_cache):
+
+        """
+        exec_all_moves of a chain state (same player must keep playing), memoized in chain_cache if one is given
+        """
+
+        if chain_cache is None:
+            return self.exec_all_moves(level)
+
+        key = self.get_key()
+        outcomes = chain_cache.outcomes.get(key)
+
+        if outcomes is None:
+            chain_cache.misses += 1
+            outcomes = self.exec_all_moves(level, chain_cache)
+            chain_cache.outcomes[key] = outcomes
+        else:
+            chain_cache.hits += 1
+
+        return outcomes
+
+    def add_outcomes(self, states, result, seen, chain_cache=None):
+
+        """
+        Append to result the states whose position isn't in seen yet (the keys of the appended states are added to seen)
+        """
+
+        for state in states:
+            key = state.get_key()
+
+            if key in seen:
+                if chain_cache is not None:
+                    chain_cache.duplicates += 1
+                continue
+
+            seen.add(key)
+            result.append(state)
+
+    def get_key(self):
+
+        """
+        64-bit zobrist key of the position: board, current player, gamestate flag and, unless the flag is FREE, the next valid start tiles
+        (see zobrist.py). Computed in O(1), the board keeps its part up to date
+        """
+
+        key = self.board.key ^ ZOBRIST.players[self.curr_player] ^ ZOBRIST.flags[self.next_move]
+
+        if self.next_move != self.FREE:
+            key ^= ZOBRIST.pending(self.pieces_mask)
+
+        return key
+
+    def exec_all_moves_bitboard(self, level=0, chain_cache=None):
+
+        """
+        Bitboard version of exec_all_moves. The destination tiles of each operation are obtained for every viable piece at once by shifting the
+        player's bitboard, so no per-piece precondition checking is needed. Must only be called on states that use a BitBoard.
+
+            ret -> array of all possible outcome states
+        """
+
+        board = self.board
+        player = self.curr_player
+        result = []
+        seen = set()                # Keys of the outcomes that may be repeated
+
+        if self.next_move == self.FREE:
+            capturing = board.capture_sources(player)
+
+            # Check for pieces that may capture
+            if capturing:
+                self.next_move = self.CAPT
+                self.pieces_mask = capturing
+                self.bitboard_captures(capturing, result, seen, level, chain_cache)
+            else:
+                self.bitboard_jumps(board.boards[player], result, seen, level, chain_cache)
+                self.bitboard_moves(result, seen, level, chain_cache)
+
+        elif self.next_move == self.CAPT:
+            self.bitboard_captures(self.pieces_mask, result, seen, level, chain_cache)
+        elif self.next_move == self.JUMP:
+            self.bitboard_jumps(self.pieces_mask, result, seen, level, chain_cache)
+        elif self.next_move == self.ADDPIECE_2:
+            return self.op_add_piece_bot(self.next_pieces)
+
+        return result
+
+    def bitboard_moves(self, result, seen, level, chain_cache=None):
+
+        """
+        Append the outcomes of all the ordinary-moves of the current player to result
+        """
+
+        player = self.curr_player
+        enemy = self.get_enemy(player)
+        other_side = OTHER_SIDE[player]
+        boards = self.board.boards
+        key = self.board.key
+        keys = PIECE_KEYS[player]
+        empty = self.board.empty()
+
+        for direction in MOVE_DIRECTIONS[player]:
+            step = direction[0]
+            targets = shift(boards[player], direction) & empty
+
+            while targets:
+                land = targets & -targets
+                targets ^= land
+                idx = land.bit_length() - 1
+                new_boards = boards.copy()
+                new_boards[player] ^= land | (1 << (idx - step))
+                new_key = key ^ keys[idx] ^ keys[idx - step]
+
+                # Moves that don't reach the opposite side always end the turn
+                if land & other_side:
+                    self.bitboard_outcome(new_boards, new_key, idx, None, result, seen, level, chain_cache)
+                else:
+                    new_gs = Eximo(enemy, 0, 0, BitBoard(new_boards, new_key))
+                    new_gs.last_piece = INDEX_COORDS[idx]
+                    result.append(new_gs)
+
+    def bitboard_jumps(self, sources, result, seen, level, chain_cache=None):
+
+        """
+        Append the outcomes of all the jump-moves of the pieces in the sources bitmask to result
+        """
+
+        player = self.curr_player
+        boards = self.board.boards
+        key = self.board.key
+        keys = PIECE_KEYS[player]
+
+        for direction in JUMP_DIRECTIONS[player]:
+            step = direction[0]
+            targets = self.board.jump_targets(player, direction, sources)
+
+            while targets:
+                land = targets & -targets
+                targets ^= land
+                idx = land.bit_length() - 1
+                new_boards = boards.copy()
+                new_boards[player] ^= land | (1 << (idx - 2 * step))
+                new_key = key ^ keys[idx] ^ keys[idx - 2 * step]
+                self.bitboard_outcome(new_boards, new_key, idx, self.JUMP, result, seen, level, chain_cache)
+
+    def bitboard_captures(self, sources, result, seen, level, chain_cache=None):
+
+        """
+        Append the outcomes of all the captures of the pieces in the sources bitmask to result
+        """
+
+        player = self.curr_player
+        enemy = self.get_enemy(player)
+        boards = self.board.boards
+        key = self.board.key
+        keys = PIECE_KEYS[player]
+
+        for direction in CAPTURE_DIRECTIONS[player]:
+            step = direction[0]
+            targets = self.board.capture_targets(player, direction, sources)
+
+            while targets:
+                land = targets & -targets
+                targets ^= land
+                idx = land.bit_length() - 1
+                new_boards = boards.copy()
+                new_boards[player] ^= land | (1 << (idx - 2 * step))
+                new_boards[enemy] ^= 1 << (idx - step)
+                new_key = key ^ keys[idx] ^ keys[idx - 2 * step] ^ PIECE_KEYS[enemy][idx - step]
+                self.bitboard_outcome(new_boards, new_key, idx, self.CAPT, result, seen, level, chain_cache)
+
+    def bitboard_outcome(self, new_boards, new_key, idx, chain, result, seen, level, chain_cache=None):
+
+        """
+        Build the state that results of moving a piece to the tile idx and apply the same post-conditions as the op_*_postconditions functions.
+
+            new_boards -> bitboards after the piece was moved (and the captured piece removed)
+            new_key    -> zobrist key of new_boards
+            idx        -> bit index of the destination tile
+            chain      -> JUMP or CAPT if the same piece may have to keep jumping/capturing, None for ordinary-moves
+            seen       -> keys of the outcomes in result that may be repeated
+        """
+
+        player = self.curr_player
+        last_piece = INDEX_COORDS[idx]
+        new_board = BitBoard(new_boards, new_key)
+
+        # Check if moved piece has reached opposite side
+        if (1 << idx) & OTHER_SIDE[player]:
+            new_boards[player] ^= 1 << idx
+            new_board.key ^= PIECE_KEYS[player][idx]
+            new_gs = Eximo(player, self.ADDPIECE_2, new_board.addition_tiles(player), new_board)
+            new_gs.perform_checkup()
+
+        # Check if the next move must also be a jump/capture by the same piece
+        elif chain == self.JUMP and new_board.can_jump_from(player, idx):
+            new_gs = Eximo(player, self.JUMP, 1 << idx, new_board)
+        elif chain == self.CAPT and new_board.can_capture_from(player, idx):
+            new_gs = Eximo(player, self.CAPT, 1 << idx, new_board)
+        else:
+            new_gs = Eximo(self.get_enemy(player), self.FREE, 0, new_board)
+
+        new_gs.last_piece = last_piece
+
+        if new_gs.curr_player != player:
+
+            # A single operation that leaves the moved piece on the board can't end in the same position as any other outcome
+            if new_boards[player] & (1 << idx):
+                result.append(new_gs)
+            else:
+                self.add_outcomes([new_gs], result, seen, chain_cache)
+        else:
+            self.add_outcomes(new_gs.expand_chain(level + 1, chain_cache), result, seen, chain_cache)
+
+    """
+    In-place operations (make/unmake)
+    """
+
+    def copy(self):
+
+        """
+        Get an independent copy of the current state (the board is copied as well)
+        """
+
+        new_gs = Eximo(self.curr_player, self.next_move, self.pieces_mask, self.board.copy())
+        new_gs.last_piece = self.last_piece
+
+        return new_gs
+
+    def null_move(self):
+
+        """
+        Get the state where the current player passes the turn (not a legal move, used by the null-move pruning of the search). Must only be
+        called on FREE states
+        """
+
+        return Eximo(self.get_enemy(self.curr_player), self.FREE, 0, self.board.copy())
+
+    def operations(self):
+
+        """
+        Get the single operations that can be applied to the current state with make_move. Unlike exec_all_moves, successive jumps/captures are not
+        followed, so the state after an operation may still belong to the current player. Like exec_all_moves, a FREE state with mandatory captures
+        is switched to the CAPT flag.
+
+            ret -> list of operations: (start, end) tuples for moves, jumps and captures, tuples with the tile(s) where pieces are added for add-piece states
+        """
+
+        # Add-piece states (pieces are added in pairs, as in op_add_piece_bot)
+        if self.next_move == self.ADDPIECE_2:
+            return list(self.iter_add_placements())
+
+        elif self.next_move == self.ADDPIECE_1:
+            return [(tile,) for tile in self.next_pieces]
+
+        if isinstance(self.board, BitBoard):
+            return self.bitboard_operations()
+
+        moves = [(self.op_move_north_pre, 0, 1), (self.op_move_nwest_pre, 1, 1), (self.op_move_neast_pre, -1, 1)]
+        jmps = [(self.op_jump_north_pre, 0, 2), (self.op_jump_nwest_pre, 2, 2), (self.op_jump_neast_pre, -2, 2)]
+        capts = [(self.op_capture_north_pre, 0, 2), (self.op_capture_nwest_pre, 2, 2), (self.op_capture_neast_pre, -2, 2),
+                 (self.op_capture_east_pre, -2, 0), (self.op_capture_west_pre, 2, 0)]
+        ops = []
+
+        # Pre-select all operations that may be executed
+        if self.next_move == self.FREE:
+            capturingStarts, otherStarts = self.possible_capture()
+
+            # Check for pieces that may capture
+            if len(capturingStarts) > 0:
+                self.next_move = self.CAPT
+                self.next_pieces = capturingStarts
+                ops = capts
+            else:
+                ops = jmps + moves
+                self.next_pieces = otherStarts
+
+        elif self.next_move == self.CAPT:
+            ops = capts
+        elif self.next_move == self.JUMP:
+            ops = jmps
+
+        dir_ = self.get_direction()
+        result = []
+
+        for pos in self.next_pieces:
+            for pre, dx, dy in ops:
+                if pre(pos):
+                    result.append((pos, (pos[0] + dx * dir_, pos[1] + dy * dir_)))
+
+        return result
+
+    def bitboard_operations(self):
+
+        """
+        Bitboard version of operations (without the add-piece states). Must only be called on states that use a BitBoard.
+        """
+
+        board = self.board
+        player = self.curr_player
+        result = []
 
+        if self.next_move == self.FREE:
+            capturing = board.capture_sources(player)
+
+            # Check for pieces that may capture
+            if capturing:
+                self.next_move = self.CAPT
+                self.pieces_mask = capturing
+                steps = [(d, 2, board.capture_targets(player, d, capturing)) for d in CAPTURE_DIRECTIONS[player]]
+            else:
+                steps = [(d, 2, board.jump_targets(player, d)) for d in JUMP_DIRECTIONS[player]]
+                steps += [(d, 1, board.move_targets(player, d)) for d in MOVE_DIRECTIONS[player]]
+
+        elif self.next_move == self.CAPT:
+            sources = self.pieces_mask
+            steps = [(d, 2, board.capture_targets(player, d, sources)) for d in CAPTURE_DIRECTIONS[player]]
+        elif self.next_move == self.JUMP:
+            sources = self.pieces_mask
+            steps = [(d, 2, board.jump_targets(player, d, sources)) for d in JUMP_DIRECTIONS[player]]
+        else:
+            return result
+
+        for direction, distance, targets in steps:
+            for idx in bit_indexes(targets):
+                result.append((INDEX_COORDS[idx - distance * direction[0]], INDEX_COORDS[idx]))
 
         return result
 
+    """
+    Compact moves
+    """
+
+    def generate_moves(self, chain_cache=None):
+
+        """
+        Get the compact representation of all possible moves from the current state (see "Compact moves" at the top of the module), one for each
+        outcome of exec_all_moves. No successor state is built, apply(move) builds the one that corresponds to a move.
+
+            chain_cache -> optional ChainCache used to memoize the chains of jumps/captures/piece additions and count the removed duplicates
+
+            ret -> list of moves
+        """
+
+        return list(self.iter_moves(chain_cache))
+
+    def iter_moves(self, chain_cache=None):
+
+        """
+        Generator version of generate_moves. Moves are yielded as soon as they are found (the chains of jumps/captures that start with an
+        operation are only expanded when the generator reaches it), so a consumer that stops early skips the remaining generation work.
+        """
+
+        operations = self.operations()
+        other_side = 1 if self.curr_player == self.PLAYER1 else 8
+        work_state = None
+        seen = set()
+
+        for operation in operations:
+
+            # Ordinary-moves that don't reach the opposite side always end the turn and never end in the same position
+            if self.next_move == self.FREE and len(operation) == 2 and abs(operation[1][1] - operation[0][1]) == 1 and operation[1][1] != other_side:
+                yield (pack_tile(operation[0]), pack_tile(operation[1]))
+                continue
+
+            if work_state is None:
+                work_state = self.copy()
+
+            for move, key in work_state.operation_moves(operation, chain_cache):
+
+                if key is None:
+                    yield move
+                    continue
+
+                if key in seen:
+                    if chain_cache is not None:
+                        chain_cache.duplicates += 1
+                    continue
+
+                seen.add(key)
+                yield move
+
+    def has_move(self, move, chain_cache=None, flags_set=False):
+
+        """
+        Check if a compact move can be played from the current state (e.g. a move read from a transposition table, which may be another
+        position's after a key collision). Only the moves that start with the move's first operation are generated. Like operations, a FREE
+        state with mandatory captures is switched to the CAPT flag. The state is otherwise left unchanged.
+
+            flags_set -> True if operations was already called on the state (e.g. its move generator was started), so a FREE state has no
+                         mandatory captures and ordinary-moves are checked on the board alone
+        """
+
+        # Ordinary-move that doesn't reach the opposite side
+        if flags_set and self.next_move == self.FREE and len(move) == 2:
+            (x0, y0), (x1, y1) = INDEX_COORDS[move[0]], INDEX_COORDS[move[1]]
+
+            if y1 - y0 == self.get_direction() and abs(x1 - x0) <= 1 and y1 != (1 if self.curr_player == self.PLAYER1 else 8):
+                return self.board.get_element(x0, y0) == self.curr_player and self.board.get_element(x1, y1) == self.EMPTY
+
+        if self.next_move == self.ADDPIECE_1 or self.next_move == self.ADDPIECE_2:
+            operation = tuple(INDEX_COORDS[tile] for tile in move)
+        elif len(move) < 2:
+            return False
+        else:
+            operation = (INDEX_COORDS[move[0]], INDEX_COORDS[move[1]])
+
+        if operation not in self.operations():
+            return False
+
+        return any(other == move for other, key in self.operation_moves(operation, chain_cache))
+
+    def operation_moves(self, operation, chain_cache=None):
+
+        """
+        Get the moves that start with the given operation, as (move, key of the final position) pairs. The key is None for moves that can't end in the
+        same position as another one. The state is left unchanged.
+        """
+
+        if self.next_move == self.ADDPIECE_1 or self.next_move == self.ADDPIECE_2:
+            path = tuple(pack_tile(tile) for tile in operation)
+        else:
+            path = (pack_tile(operation[0]), pack_tile(operation[1]))
+
+        player = self.curr_player
+        undo = self.make_move(operation)
+
+        # Successive jumps/captures or piece addition by the same player
+        if self.curr_player == player:
+            result = [(path + tiles, key) for tiles, key in self.chain_moves(chain_cache)]
+
+        # A single operation that leaves the moved piece on the board can't end in the same position as any other move (no key needed)
+        elif len(operation) == 2 and self.board.get_element(operation[1][0], operation[1][1]) == player:
+            result = [(path, None)]
+        else:
+            result = [(path, self.get_key())]
+
+        self.unmake_move(undo)
+
+        return result
+
+    def chain_moves(self, chain_cache=None):
+
+        """
+        Get the ways to finish the turn from a chain state (same player must keep jumping, capturing or adding pieces), as (packed tiles of the
+        remaining operations, key of the final position) pairs. Memoized in chain_cache if one is given. The state is left unchanged.
+        """
+
+        if chain_cache is not None:
+            chain_key = self.get_key()
+            result = chain_cache.moves.get(chain_key)
+
+            if result is not None:
+                chain_cache.hits += 1
+                return result
+
+        result = []
+        player = self.curr_player
+
+        for operation in self.operations():
+
+            if self.next_move == self.ADDPIECE_1 or self.next_move == self.ADDPIECE_2:
+                step = tuple(pack_tile(tile) for tile in operation)
+            else:
+                step = (pack_tile(operation[1]),)
+
+            undo = self.make_move(operation)
+
+            if self.curr_player == player:
+                result.extend((step + tiles, key) for tiles, key in self.chain_moves(chain_cache))
+            else:
+                result.append((step, self.get_key()))
+
+            self.unmake_move(undo)
+
+        if chain_cache is not None:
+            chain_cache.misses += 1
+            chain_cache.moves[chain_key] = result
+
+        return result
+
+    def iter_all_moves(self):
+
+        """
+        Generator version of exec_all_moves. Outcome states are built and yielded one at a time (including the outcomes of chains of jumps/captures,
+        as soon as each chain ends), so a consumer that stops early neither builds nor generates the remaining ones.
+        """
+
+        for move in self.iter_moves():
+            yield self.apply(move)
+
+    def apply(self, move):
+
+        """
+        Build the state that results of executing a move returned by generate_moves on the current state
+
+            move -> compact move
+
+            ret -> resulting state
+        """
+
+        new_gs = self.copy()
+        tiles = [INDEX_COORDS[tile] for tile in move]
+
+        if new_gs.next_move == self.ADDPIECE_1 or new_gs.next_move == self.ADDPIECE_2:
+            new_gs.make_move(tuple(tiles))
+            return new_gs
+
+        new_gs.make_move((tiles[0], tiles[1]))
+
+        for idx in range(2, len(tiles)):
+
+            # The remaining tiles are where pieces are added
+            if new_gs.next_move == self.ADDPIECE_1 or new_gs.next_move == self.ADDPIECE_2:
+                new_gs.make_move(tuple(tiles[idx:]))
+                break
+
+            new_gs.make_move((tiles[idx - 1], tiles[idx]))
+
+        return new_gs
+
+    def make_move(self, operation):
+
+        """
+        Apply one of the operations returned by operations() to the current state, in place. The post-conditions are the same as the ones of the
+        op_*_postconditions functions (and of op_add_piece_bot for ADDPIECE_2 states).
+
+            operation -> operation to apply
+
+            ret -> undo record, to be given to unmake_move. (operation, captured piece, player, flag, next pieces, last piece), where the last four
+                   are the values before the operation
+        """
+
+        board = self.board
+        player = self.curr_player
+        enemy = self.get_enemy(player)
+        flag = self.next_move
+        undo = (operation, None, player, flag, self.pieces_mask, self.last_piece)
+
+        # Piece addition. Both pieces of an ADDPIECE_2 state are added at once
+        if flag == self.ADDPIECE_1 or flag == self.ADDPIECE_2:
+
+            for tile in operation:
+                board.set_element(tile[0], tile[1], player)
+
+            self.curr_player = enemy
+            self.next_move = self.FREE
+            self.pieces_mask = 0
+            self.last_piece = operation[-1] if flag == self.ADDPIECE_1 else None
+
+            return undo
+
+        start, end = operation
+        board.set_element(end[0], end[1], player)
+        board.remove_element(start[0], start[1])
+
+        captured = None
+        if flag == self.CAPT:
+            captured = ((start[0] + end[0]) // 2, (start[1] + end[1]) // 2)
+            board.remove_element(captured[0], captured[1])
+            undo = (operation, captured, player, flag, self.pieces_mask, self.last_piece)
+
+        jumped = captured is None and (abs(end[0] - start[0]) == 2 or abs(end[1] - start[1]) == 2)
+
+        self.next_move = self.FREE
+        self.pieces_mask = 0
+        self.last_piece = end
+
+        # Check if moved piece has reached opposite side
+        if self.reach_otherside(end):
+            board.remove_element(end[0], end[1])
+            self.next_move = self.ADDPIECE_2
+            self.next_pieces = self.addition_viable_tiles()
+            self.perform_checkup()
+
+        # Check if the next move must also be a jump/capture by the same player
+        elif jumped and self.can_jump(end):
+            self.next_move = self.JUMP
+            self.pieces_mask = coords_to_bit(end)
+        elif captured and self.can_capture(end):
+            self.next_move = self.CAPT
+            self.pieces_mask = coords_to_bit(end)
+        else:
+            self.curr_player = enemy
+
+        return undo
+
+    def unmake_move(self, undo):
+
+        """
+        Revert the operation that produced the given undo record (must be the last operation applied with make_move)
+        """
+
+        operation, captured, player, flag, next_pieces, last_piece = undo
+        board = self.board
+
+        if flag == self.ADDPIECE_1 or flag == self.ADDPIECE_2:
+            for tile in operation:
+                board.remove_element(tile[0], tile[1])
+        else:
+            start, end = operation
+            board.remove_element(end[0], end[1])
+            board.set_element(start[0], start[1], player)
+
+            if captured:
+                board.set_element(captured[0], captured[1], self.get_enemy(player))
+
+        self.curr_player = player
+        self.next_move = flag
+        self.pieces_mask = next_pieces
+        self.last_piece = last_piece
+
 
     def move(self, initial_pos, final_pos):
 
@@ -1401,7 +2167,7 @@ class Eximo:
             return False
 
         # Check if the intial position is a valid start piece
-        if initial_pos not in self.next_pieces:
+        if not self.is_next_piece(initial_pos):
             return False
 
         # Test for add piece operation
@@ -1427,5 +2193,5 @@ class Eximo:
             ret -> True if the current player  has lost the game, False otherwise
         """
 
-        if len(self.next_pieces) == 0:
+        if self.pieces_mask == 0:
             return True
@@ -1,14 +1,25 @@
 from Eximo import *
 from Graphics import *
 from Minmax  import *
+from ponder import Ponder
+from MCTS import MCTS
 import sys
 from time import sleep
 
 class Game:
 
-    def __init__(self, p1Type, p2Type, depths, heur, cuts, user_state_ordering):
+    def __init__(self, p1Type, p2Type, depths, heur, cuts, user_state_ordering, board='matrix', make_unmake=False, streaming=True,
+                 add_ordering=True, add_pruning='none', tt_size=0,
+                 time_ms=None, nodes=None, engine='minmax',
+                 ordering='eval', aspiration=0, aspiration_growth=2, quiescence=False, q_nodes=200,
+                 null_move=False, verify_null=True, lmr=False, futility=False, razoring=False,
+                 workers=1, parallel='root', ponder=False, persistent=False, exploration=1.41, playout='random', iterations=None):
 
-        self.state = Eximo()
+        # Piece additions of the computers
+        Eximo.ADD_ORDERING = add_ordering
+        Eximo.ADD_PRUNING = add_pruning
+
+        self.state = Eximo(board=BOARD_BACKENDS[board]())
         self.state.perform_full_checkup()
 
         # Init pygame graphics
@@ -22,14 +33,34 @@ class Game:
         self.heuristics = heur
         self.use_cuts = cuts
         self.user_state_ordering = user_state_ordering
+        self.tt_size = tt_size
+        self.ponder = ponder
+        self.persistent = persistent
+
+        # Keyword arguments of the search engines of both computers (the depth, heuristic, cuts and ordering are given for each one)
+        self.minmax_settings = {'make_unmake': make_unmake, 'streaming': streaming, 'tt_size': tt_size, 'time_ms': time_ms, 'nodes': nodes,
+                                'engine': engine, 'ordering': ordering, 'aspiration': aspiration, 'aspiration_growth': aspiration_growth,
+                                'quiescence': quiescence, 'q_nodes': q_nodes, 'null_move': null_move, 'verify_null': verify_null,
+                                'lmr': lmr, 'futility': futility, 'razoring': razoring, 'workers': workers, 'parallel': parallel}
+        self.mcts_settings = {'exploration': exploration, 'iterations': iterations, 'time_ms': time_ms, 'playout': playout,
+                              'workers': workers}
+
+        # Search engine of each computer, kept for all its moves if persistent (otherwise a new one is built for each move)
+        self.engines = [None, None]
+
+        # Background search of each computer on the opponent's time (started after its first move)
+        self.ponders = [None, None]
+
+        # Value of the last move of each computer (guess for the aspiration windows of the next one)
+        self.last_values = [None, None]
 
 
         # Init stats
         cutLevelsP1 = [] if self.depths[0] == None else [0 for i in range(self.depths[0]+1)]
         cutLevelsP2 = [] if self.depths[1] == None else [0 for i in range(self.depths[1]+1)]
 
-        self.statsP1 = {'total_exec_time': 0, 'total_avg_expansion': 0, 'leafCount': 0, 'totalCutCount': 0, 'cutLevels': cutLevelsP1}
-        self.statsP2 = {'total_exec_time': 0, 'total_avg_expansion': 0, 'leafCount': 0, 'totalCutCount': 0, 'cutLevels': cutLevelsP2}
+        self.statsP1 = {'total_exec_time': 0, 'total_avg_expansion': 0, 'leafCount': 0, 'totalCutCount': 0, 'cutLevels': cutLevelsP1, 'prunedLevels': list(cutLevelsP1), 'unbuiltCount': 0, 'duplicateCount': 0, 'researchCount': 0, 'nodeCount': 0, 'quiescenceCount': 0, 'reusedCount': 0}
+        self.statsP2 = {'total_exec_time': 0, 'total_avg_expansion': 0, 'leafCount': 0, 'totalCutCount': 0, 'cutLevels': cutLevelsP2, 'prunedLevels': list(cutLevelsP2), 'unbuiltCount': 0, 'duplicateCount': 0, 'researchCount': 0, 'nodeCount': 0, 'quiescenceCount': 0, 'reusedCount': 0}
 
         # Start the game
         self.run()
@@ -38,7 +69,7 @@ class Game:
     def get_current_type(self):
 
         """
-        Return the current players type (C or P, for Computer and Player respectively)
+        Return the current players type (C, M or P, for Computer (Minmax), Computer (MCTS) and Player respectively)
         """
         if self.state.curr_player == 1:
             return self.p1Type
@@ -51,7 +82,7 @@ class Game:
         Check if the game is only played by the computer (AI vs AI)
         """
 
-        return self.p1Type == self.p2Type and self.p1Type == 'C'
+        return self.p1Type in ('C', 'M') and self.p2Type in ('C', 'M')
 
 
     def get_stats(self):
@@ -164,14 +195,46 @@ class Game:
 
             # AI move ?
             else:
-                # Run minimax
-                mm = Minmax(self.depths[self.state.curr_player - 1],
-                            self.state.curr_player,
-                            self.heuristics[self.state.curr_player - 1],
-                            self.use_cuts[self.state.curr_player - 1],
-                            self.user_state_ordering[self.state.curr_player -1] )
-
-                self.state = mm.move(self.state)
+                player = self.state.curr_player
+
+                # Stop pondering, the opponent moved
+                ponder = self.ponders[player - 1]
+                if ponder is not None:
+                    ponder.finish(self.state)
+
+                # Run Monte Carlo Tree Search
+                if self.get_current_type() == 'M':
+                    mm = MCTS(player=player, eval_number=self.heuristics[player - 1], **self.mcts_settings)
+                    self.state = mm.move(self.state)
+
+                else:
+                    # Run minimax
+                    mm = self.engines[player - 1]
+                    if mm is None:
+                        mm = Minmax(depth=self.depths[player - 1],
+                                    player=player,
+                                    eval_number=self.heuristics[player - 1],
+                                    use_cuts=self.use_cuts[player - 1],
+                                    use_state_ordering=self.user_state_ordering[player - 1],
+                                    **self.minmax_settings)
+
+                        if self.persistent:
+                            self.engines[player - 1] = mm
+
+                    # Search with the table filled while pondering
+                    if self.ponder:
+                        if ponder is None:
+                            settings = mm.worker_settings()
+                            settings['tt_size'] = 0
+                            ponder = self.ponders[player - 1] = Ponder(settings, self.tt_size if self.tt_size > 0 else 16)
+                        mm.tt = ponder.table
+
+                    self.state = mm.move(self.state, self.last_values[player - 1])
+                    self.last_values[player - 1] = mm.res
+
+                    # Search the opponent's replies until it moves
+                    if ponder is not None:
+                        ponder.start(self.state)
 
                 # Print new gamestate
                 self.state.print_state(sys.stdout,self.turnCount)
@@ -179,6 +242,10 @@ class Game:
                 # Update game variables
                 self.update_stats(mm.stats())
 
+                # Free the search engine, unless it is kept for the next moves
+                if isinstance(mm, Minmax) and self.engines[player - 1] is not mm:
+                    mm.close()
+
 
             self.state.perform_full_checkup()
 
@@ -188,6 +255,14 @@ class Game:
 
 
 
+        for ponder in self.ponders:
+            if ponder is not None:
+                ponder.close()
+
+        for engine in self.engines:
+            if engine is not None:
+                engine.close()
+
         self.display_statistics()
 
 
@@ -204,12 +279,26 @@ class Game:
             self.statsP1['leafCount'] += stats[2]
             self.statsP1['totalCutCount'] += stats[3]
             self.statsP1['cutLevels'] = [self.statsP1['cutLevels'][i] + stats[4][i] for i in range(len( stats[4]))]
+            self.statsP1['unbuiltCount'] += stats[5]
+            self.statsP1['duplicateCount'] += stats[6]
+            self.statsP1['researchCount'] += stats[7]
+            self.statsP1['nodeCount'] += stats[8]
+            self.statsP1['quiescenceCount'] += stats[9]
+            self.statsP1['prunedLevels'] = [self.statsP1['prunedLevels'][i] + stats[10][i] for i in range(len( stats[10]))]
+            self.statsP1['reusedCount'] += stats[11]
         else:
             self.statsP2['total_exec_time'] += stats[0]
             self.statsP2['total_avg_expansion'] += stats[1]
             self.statsP2['leafCount'] += stats[2]
             self.statsP2['totalCutCount'] += stats[3]
             self.statsP2['cutLevels'] = [self.statsP2['cutLevels'][i] + stats[4][i] for i in range(len( stats[4]))]
+            self.statsP2['unbuiltCount'] += stats[5]
+            self.statsP2['duplicateCount'] += stats[6]
+            self.statsP2['researchCount'] += stats[7]
+            self.statsP2['nodeCount'] += stats[8]
+            self.statsP2['quiescenceCount'] += stats[9]
+            self.statsP2['prunedLevels'] = [self.statsP2['prunedLevels'][i] + stats[10][i] for i in range(len( stats[10]))]
+            self.statsP2['reusedCount'] += stats[11]
 
     def display_statistics(self):
         """
@@ -218,23 +307,43 @@ class Game:
 
         print("\n________Game Statistics________\n")
 
-        if self.p1Type == 'C':
+        if self.p1Type in ('C', 'M'):
             print("-- Player 1 (depth = {}):".format(self.depths[0]))
             print("Time: " + str(self.statsP1['total_exec_time']) + " (" + str(self.turnCount // 2) + " turns, "+str(self.statsP1['total_exec_time']/(self.turnCount // 2)) +" avg)")
             print("Avg. branching factor: " + str(self.statsP1['total_avg_expansion']/ (self.turnCount // 2)))
             print("Total cuts: " + str(self.statsP1['totalCutCount']) + " (" + str(self.statsP1['totalCutCount'] / (self.turnCount //2)) + " avg)")
             print("Cut levels: ", end="")
             print(self.statsP1['cutLevels'])
+            print("Pruned levels: ", end="")
+            print(self.statsP1['prunedLevels'])
             print("Total leaves: " + str(self.statsP1['leafCount'] ) + " (" + str(self.statsP1['leafCount']  / (self.turnCount //2)) + " avg)")
+            print("Unbuilt successors: " + str(self.statsP1['unbuiltCount']))
+            print("Duplicates removed: " + str(self.statsP1['duplicateCount']))
+            print("Aspiration re-searches: " + str(self.statsP1['researchCount']))
+            print("Total nodes: " + str(self.statsP1['nodeCount']))
+            print("Quiescence nodes: " + str(self.statsP1['quiescenceCount']))
+            print("TT hits on entries of earlier moves: " + str(self.statsP1['reusedCount']))
+            if self.ponders[0] is not None:
+                self.ponders[0].print_stats()
             print()
 
-        if self.p2Type == 'C':
+        if self.p2Type in ('C', 'M'):
             print("-- Player 2 (depth = {}):".format(self.depths[0]))
             print("Time: " + str(self.statsP2['total_exec_time']) + " (" + str(self.turnCount // 2) + " turns, "+str(self.statsP2['total_exec_time']/(self.turnCount // 2)) +" avg)")
             print("Avg. branching factor: " + str(self.statsP2['total_avg_expansion']/ (self.turnCount // 2)))
             print("Total cuts: " + str(self.statsP2['totalCutCount']) + " (" + str(self.statsP2['totalCutCount'] / (self.turnCount //2)) + " avg)")
             print("Cut levels: ", end="")
             print(self.statsP2['cutLevels'])
+            print("Pruned levels: ", end="")
+            print(self.statsP2['prunedLevels'])
             print("Total leaves: " + str(self.statsP2['leafCount'] ) + " (" + str(self.statsP2['leafCount']  / (self.turnCount //2)) + " avg)")
+            print("Unbuilt successors: " + str(self.statsP2['unbuiltCount']))
+            print("Duplicates removed: " + str(self.statsP2['duplicateCount']))
+            print("Aspiration re-searches: " + str(self.statsP2['researchCount']))
+            print("Total nodes: " + str(self.statsP2['nodeCount']))
+            print("Quiescence nodes: " + str(self.statsP2['quiescenceCount']))
+            print("TT hits on entries of earlier moves: " + str(self.statsP2['reusedCount']))
+            if self.ponders[1] is not None:
+                self.ponders[1].print_stats()
             print()
 
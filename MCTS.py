@@ -0,0 +1,310 @@
+import math
+import random
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from Eximo import ChainCache
+from evaluation import EVALS
+
+'''
+
+MCTS class
+
+. Monte Carlo Tree Search (UCT), an alternative to Minmax for the computer players. Each iteration selects a leaf of the tree, choosing at
+each node the child with the best upper confidence bound (win rate + exploration * sqrt(ln(parent visits) / visits), unvisited children
+first), expands it with all its outcomes (Eximo.exec_all_moves, so a chain of jumps/captures or piece additions is a single edge), plays
+the game out from one of them and adds the result to every node of the path. The most visited root child is played.
+. Playouts are random, or heuristic: the successor with the best evaluation for the player to move (with the heuristic of the player), or
+a random one with probability HEURISTIC_EPSILON. A player without successors loses. Playouts that reach playout_depth turns are won by the
+player with more pieces.
+. The tree is stored in arrays indexed by node (parent, first child, number of children, visits, wins and player that moved into the
+node). The children of a node are contiguous. Each node keeps its state only until it is expanded.
+. The search runs for the given iterations and/or time (DEFAULT_ITERATIONS if neither is given). With workers > 1 it is root-parallel: each
+worker process builds its own tree (with its share of the iterations, or the whole time), and the visits and wins of the root children are
+added up.
+
+'''
+
+class MCTS:
+
+    DEFAULT_ITERATIONS = 1000
+    HEURISTIC_EPSILON = 0.2
+
+    def __init__(self, player, eval_number=3, exploration=1.41, iterations=None, time_ms=None, playout='random', playout_depth=60, workers=1,
+                 seed=None):
+
+        self.player = player
+        self.eval_number = eval_number
+        self.exploration = exploration
+        self.iterations = self.DEFAULT_ITERATIONS if iterations is None and time_ms is None else iterations
+        self.time_ms = time_ms
+        self.playout = playout
+        self.playout_depth = playout_depth
+        self.workers = workers
+        self.seed = seed
+        self.random = random.Random(seed)
+
+        # Evaluation function (heuristic playouts)
+        self.evaluate = EVALS[eval_number - 1]
+
+        # Result game evaluation (win rate of the chosen move)
+        self.res = 0
+
+        # Statistics
+        self.playoutCount = 0
+        self.expansionCount = 0
+        self.expansionTotal = 0
+        self.treeDepth = 0
+        self.execTime = 0
+
+        self.chain_cache = ChainCache()
+        self.new_tree()
+
+    def new_tree(self):
+
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.child_count = array('i')       # -1 until the node is expanded
+        self.visits = array('i')
+        self.wins = array('d')              # For the player that moved into the node (draws count as half a win)
+        self.mover = array('b')
+        self.states = []
+
+    def add_node(self, parent, state, mover):
+
+        self.parent.append(parent)
+        self.first_child.append(0)
+        self.child_count.append(-1)
+        self.visits.append(0)
+        self.wins.append(0)
+        self.mover.append(mover)
+        self.states.append(state)
+
+    def move(self, state):
+
+        """
+        Search the state and return the chosen successor
+        """
+
+        start = time.time()
+
+        # Chains are only memoized for the duration of a search
+        self.chain_cache = ChainCache()
+
+        outcomes = state.exec_all_moves(1, self.chain_cache)
+
+        # No posssible successors (gameover), or a single one
+        if len(outcomes) <= 1:
+            self.execTime = time.time() - start
+            return outcomes[0] if outcomes else state
+
+        if self.workers > 1:
+            visits, wins = self.search_parallel(state)
+        else:
+            visits, wins = self.search(state)
+
+        best = max(range(len(outcomes)), key=lambda idx: visits[idx])
+
+        self.execTime = time.time() - start
+        self.res = wins[best] / max(visits[best], 1)
+
+        return outcomes[best]
+
+    def search(self, state):
+
+        """
+        Build the tree of the state for the iterations and/or time of the search. Returns the visits and wins of the root children
+        """
+
+        deadline = time.time() + self.time_ms / 1000 if self.time_ms is not None else None
+
+        self.new_tree()
+        self.add_node(-1, state.copy(), state.get_enemy(state.curr_player))
+        self.expand(0)
+
+        iteration = 0
+        while self.iterations is None or iteration < self.iterations:
+
+            if deadline is not None and time.time() >= deadline:
+                break
+
+            self.iterate()
+            iteration += 1
+
+        first = self.first_child[0]
+        count = self.child_count[0]
+
+        return list(self.visits[first:first + count]), list(self.wins[first:first + count])
+
+    def search_parallel(self, state):
+
+        """
+        Root-parallel search. Returns the visits and wins of the root children, added up over the trees of all the workers
+        """
+
+        iterations = None if self.iterations is None else max(1, self.iterations // self.workers)
+
+        with ProcessPoolExecutor(self.workers) as pool:
+            futures = [pool.submit(mcts_search, self.worker_settings(worker, iterations), state) for worker in range(self.workers)]
+            results = [future.result() for future in futures]
+
+        visits = [sum(counts) for counts in zip(*[result[0] for result in results])]
+        wins = [sum(counts) for counts in zip(*[result[1] for result in results])]
+
+        # Update statistics
+        for result in results:
+            self.playoutCount += result[2]
+            self.expansionCount += result[3]
+            self.expansionTotal += result[4]
+            self.treeDepth = max(self.treeDepth, result[5])
+
+        return visits, wins
+
+    def worker_settings(self, worker, iterations):
+
+        """
+        Constructor arguments of the MCTS of a worker (a sequential search with its share of the iterations and its own random seed)
+        """
+
+        return {'player': self.player, 'eval_number': self.eval_number, 'exploration': self.exploration, 'iterations': iterations,
+                'time_ms': self.time_ms, 'playout': self.playout, 'playout_depth': self.playout_depth,
+                'seed': None if self.seed is None else self.seed + worker}
+
+    def iterate(self):
+
+        node = 0
+        depth = 0
+
+        # Selection
+        while self.child_count[node] > 0:
+            node = self.select(node)
+            depth += 1
+
+        # Expansion
+        if self.child_count[node] == -1:
+            self.expand(node)
+
+            if self.child_count[node] > 0:
+                node = self.first_child[node] + self.random.randrange(self.child_count[node])
+                depth += 1
+
+        self.treeDepth = max(self.treeDepth, depth)
+
+        # Simulation (a node without successors is a loss for the player to move)
+        if self.child_count[node] == 0:
+            winner = self.mover[node]
+        else:
+            winner = self.simulate(self.states[node].copy())
+
+        # Backpropagation
+        while node != -1:
+            self.visits[node] += 1
+            if winner == self.mover[node]:
+                self.wins[node] += 1
+            elif winner == 0:
+                self.wins[node] += 0.5
+            node = self.parent[node]
+
+    def select(self, node):
+
+        """
+        Child of the node with the best upper confidence bound (the first unvisited one, if any)
+        """
+
+        first = self.first_child[node]
+        log_visits = math.log(max(self.visits[node], 1))
+        best = None
+        best_score = -float("inf")
+
+        for child in range(first, first + self.child_count[node]):
+            visits = self.visits[child]
+
+            if visits == 0:
+                return child
+
+            score = self.wins[child] / visits + self.exploration * math.sqrt(log_visits / visits)
+
+            if score > best_score:
+                best_score = score
+                best = child
+
+        return best
+
+    def expand(self, node):
+
+        state = self.states[node]
+        outcomes = state.exec_all_moves(1, self.chain_cache)
+
+        # Update statistics
+        self.expansionCount += 1
+        self.expansionTotal += len(outcomes)
+
+        self.first_child[node] = len(self.visits)
+        self.child_count[node] = len(outcomes)
+
+        for outcome in outcomes:
+            self.add_node(node, outcome, state.curr_player)
+
+        # The state is only needed to expand the node
+        self.states[node] = None
+
+    def simulate(self, state):
+
+        """
+        Play the game out from the state. Returns the winner (0 for a draw)
+        """
+
+        self.playoutCount += 1
+
+        for turn in range(self.playout_depth):
+            outcomes = state.exec_all_moves(1, self.chain_cache)
+
+            if len(outcomes) == 0:
+                return state.get_enemy(state.curr_player)
+
+            if self.playout == 'heuristic' and self.random.random() >= self.HEURISTIC_EPSILON:
+                player = state.curr_player
+                state = max(outcomes, key=lambda outcome: self.evaluate(outcome, player))
+            else:
+                state = self.random.choice(outcomes)
+
+        # Unfinished playout, the player with more pieces wins
+        pieces = state.board.count(1) - state.board.count(2)
+
+        if pieces > 0:
+            return 1
+        if pieces < 0:
+            return 2
+        return 0
+
+    def stats(self):
+
+        print("- MCTS Statistics\n")
+        print("Time: " + str(self.execTime))
+        print("Playouts: " + str(self.playoutCount) + " (" + str(self.playoutCount / max(self.execTime, 1e-9)) + " playouts/sec, " + str(self.workers) + " workers)")
+        print("Avg ramification factor: " + str(self.expansionTotal / max(self.expansionCount, 1)))
+        print("Tree depth: " + str(self.treeDepth))
+        print("Duplicates removed: " + str(self.chain_cache.duplicates))
+        print("Value: " + str(self.res))
+
+        return (self.execTime,self.expansionTotal/max(self.expansionCount, 1),self.playoutCount,0,[],0,self.chain_cache.duplicates,
+                0,self.expansionTotal + 1,0,[],0)
+
+
+"""
+Root-parallel MCTS worker
+"""
+
+def mcts_search(settings, state):
+
+    """
+    Build a tree of the state with the given settings. Returns the visits and wins of the root children, the playouts, expansions and
+    expanded children, and the depth of the tree
+    """
+
+    mcts = MCTS(**settings)
+    visits, wins = mcts.search(state)
+
+    return visits, wins, mcts.playoutCount, mcts.expansionCount, mcts.expansionTotal, mcts.treeDepth
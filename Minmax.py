@@ -1,12 +1,31 @@
 import heapq
+import math
+import multiprocessing
 import sys
 import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, as_completed
 
 import faulthandler
 faulthandler.enable()
 
+from Eximo import ChainCache
+from evaluation import EVALS
+from transposition_table import TranspositionTable, SharedTranspositionTable
+
+class SearchAborted(Exception):
+
+    """
+    Raised inside the search when the time or node budget of an iterative deepening search runs out
+    """
+
+    pass
+
 class Minmax:
-    def __init__(self, depth, player, eval_number, use_cuts, use_state_ordering):
+    def __init__(self, depth, player, eval_number, use_cuts, use_state_ordering, make_unmake=False, streaming=True, tt_size=0,
+                 time_ms=None, nodes=None, engine='minmax', ordering='eval',
+                 aspiration=0, aspiration_growth=2, quiescence=False, q_nodes=200,
+                 null_move=False, verify_null=True, lmr=False, futility=False, razoring=False, workers=1,
+                 parallel='root'):
 
         super().__init__()
 
@@ -19,26 +38,160 @@ class Minmax:
         self.use_cuts = use_cuts
         self.use_state_ordering = use_state_ordering
 
+        # ordering = 'eval' orders the successors by their evaluation (max_value_order/min_value_order), 'dynamic' (experimental) by the
+        # evaluation of the successors far from the leaves and by the moves that caused cuts before (killer moves of each ply, history of
+        # each (from, to) pair and counter-moves) close to them
+        self.ordering = ordering
+        self.dynamic_ordering = use_state_ordering and ordering == 'dynamic'
+        self.killers = [[None, None] for i in range(depth + 1)]
+        self.history = [0] * (64 * 64)
+        self.counters = [None] * (64 * 64)
+
+        # make_unmake = True implies searching over a single state, applying and reverting operations in place
+        # streaming = True implies generating the moves one at a time (the ones after a cut are never generated, so they aren't counted in the
+        # ramification factor nor in the unbuilt successors)
+        self.make_unmake = make_unmake
+        self.streaming = streaming
+
+        # engine = 'pvs' implies using the principal variation search instead of max_value/min_value (always with prunning)
+        self.engine = engine
+
         # Result game evaluation
         self.res = 0
 
-        # Evaluation functions
-        self.evals = [self.eval1, self.eval2, self.eval3, self.eval4]
-        self.evaluate = self.evals[eval_number - 1]
+        # Evaluation function (see the evaluation module)
+        self.evaluate = EVALS[eval_number - 1]
+        self.eval_number = eval_number
+
+        # Statistics (of the last search)
+        self.reset_stats()
+        self.searchCount = 0             # Searches done by this object, which may be kept for all the moves of a player
+
+        # Memoized chains of jumps/captures/piece additions, also counts the duplicated successors that were removed
+        self.chain_cache = ChainCache()
+
+        # Transposition table with a memory budget of tt_size MB (disabled if 0). Only used by max_value/min_value
+        self.tt = TranspositionTable(tt_size) if tt_size > 0 else None
+        self.tt_size = tt_size
+
+        # Table in shared memory of the Lazy SMP searches, created by the first one and kept for all the moves of this object (freed by close)
+        self.shared_tt = None
+
+        # Budget of each move. If a time (in ms) and/or node budget is given, the search is iterative deepening up to the maximum depth
+        self.time_ms = time_ms
+        self.nodes = nodes
+        self.deadline = None
+        self.node_limit = None
+        self.depthReached = depth
+
+        # Aspiration windows. If aspiration > 0, the root is first searched with a window of that half-width around a guess of its value (the
+        # value of the previous iteration or move). The window is widened by aspiration_growth times on each fail-low or fail-high
+        self.aspiration = aspiration
+        self.aspiration_growth = aspiration_growth
+
+        # quiescence = True implies searching the leaves with a pending capture until they are quiet (at most q_nodes nodes per leaf)
+        self.quiescence = quiescence
+        self.q_nodes = q_nodes
+        self.q_budget = 0
+
+        # Selective search (only with prunning). null_move = True implies null-move pruning (verified by a reduced search of the node if
+        # verify_null = True), lmr = True implies late-move reductions
+        self.null_move = null_move and use_cuts
+        self.verify_null = verify_null
+        self.lmr = lmr and use_cuts
+
+        # Frontier pruning (only with prunning). futility = True implies futility pruning at depths 1-2, razoring = True implies razoring at
+        # depths 2-3
+        self.futility = futility and use_cuts
+        self.razoring = razoring and use_cuts
+
+        # workers > 1 implies a parallel search with that many processes: splitting the root moves among them (parallel = 'root', fixed-depth
+        # max_value/min_value or pvs searches), Lazy SMP (parallel = 'smp', iterative deepening with a shared transposition table) or Young
+        # Brothers Wait (parallel = 'ybwc', fixed-depth)
+        self.workers = workers
+        self.parallel = parallel
+        self.stop = None                 # Shared flag that aborts the search of a Lazy SMP helper or Young Brothers Wait worker
+        self.split_pool = None           # Worker pool, stop flag and shared bound of the Young Brothers Wait split points
+
+    def reset_stats(self):
 
-        # Statistics
         self.leafCount = 0
         self.cutCount = 0
+        self.firstCutCount = 0           # Cuts caused by the first successor searched
         self.cutLevels = [0 for i in range(self.depth + 1)]
         self.expansionCount = 0
         self.expansionTotal = 0
+        self.unbuiltCount = 0            # Successor states never built because of cuts
+        self.researchCount = 0           # Principal variation search re-searches after a null window fail-high
+        self.aspirationResearches = 0    # Root re-searches after an aspiration window fail-low/fail-high
+        self.qNodeCount = 0              # Nodes visited by the quiescence search (not counted as leaves)
+        self.deltaPruneCount = 0         # Captures skipped by delta pruning
+        self.nullTryCount = 0            # Null-move searches
+        self.nullCutCount = 0            # Nodes pruned by a null-move search
+        self.nullVerifyFailCount = 0     # Null-move fail-highs not confirmed by the verification search
+        self.lmrCount = 0                # Late moves searched with a reduced depth
+        self.lmrResearchCount = 0        # Reduced moves searched again with the full depth
+        self.futilityCount = 0           # Moves skipped by futility pruning
+        self.razorCount = 0              # Nodes pruned by razoring
+        self.prunedLevels = [0 for i in range(self.depth + 1)]  # Futility-pruned moves and razored nodes of each ply
+        self.splitCount = 0              # Young Brothers Wait split points
+        self.speculativeCount = 0        # Nodes searched by the workers for younger brothers
+        self.wastedCount = 0             # Speculative nodes whose result was thrown away by a cut at the split point
+        self.abortedCount = 0            # Younger brothers cancelled or aborted by a cut at the split point
         self.execTime = 0
 
-    def move(self, state):
+    def new_search(self):
+
+        """
+        Prepare an object kept across moves for the search of the next one. The statistics are restarted, the killer moves are re-rooted two
+        plies down (the player's move and the opponent's reply were played) and the history is halved, so the new cuts weigh more. The
+        transposition table is kept (with a new generation for each search): the entries of the subtree of the moves played are still valid,
+        so those positions are not searched again
+        """
+
+        self.reset_stats()
+
+        self.killers = self.killers[2:] + [[None, None] for i in range(min(2, len(self.killers)))]
+        self.history = [value // 2 for value in self.history]
+
+    def move(self, state, guess=None):
+
+        """
+        Search the state and return the chosen successor. guess is the expected value of the state (used for aspiration windows), usually
+        the value of the player's previous move
+        """
 
         start = time.time()
 
-        if self.use_state_ordering:
+        if self.searchCount > 0:
+            self.new_search()
+        self.searchCount += 1
+
+        if self.tt is not None:
+            self.tt.new_search()
+
+        # Chains are only memoized for the duration of a search
+        self.chain_cache = ChainCache()
+
+        # Aspiration windows only apply to the searches that start at the root moves
+        aspiration = self.aspiration > 0 and guess is not None and not self.make_unmake and not (self.use_state_ordering and self.ordering == 'eval')
+
+        # Parallel searches start at the root moves as well
+        parallel = self.workers > 1 and not self.make_unmake and not (self.use_state_ordering and self.ordering == 'eval')
+
+        if parallel and self.parallel == 'smp':
+            result = self.move_smp(state, guess)
+        elif self.time_ms is not None or self.nodes is not None:
+            result = self.move_iterative(state, guess)
+        elif parallel and self.parallel == 'ybwc':
+            result = self.move_ybwc(state)
+        elif parallel:
+            result = self.move_parallel(state)
+        elif self.engine == 'pvs' or aspiration:
+            result = self.move_root(state, guess)
+        elif self.make_unmake:
+            result = self.move_inplace(state)
+        elif self.use_state_ordering and self.ordering == 'eval':
             result = self.max_value_order(state,-float("inf"),float("inf"),self.depth)
         else:
             result = self.max_value(state,-float("inf"),float("inf"),self.depth)
@@ -56,49 +209,873 @@ class Minmax:
         print("Time: " + str(self.execTime))
         print("Avg ramification factor: " + str(self.expansionTotal/self.expansionCount))
         print("Cut count: " + str(self.cutCount))
+        print("First-move cut rate: " + str(self.firstCutCount/max(self.cutCount, 1)))
         print("Cut levels: " , end="")
         print(self.cutLevels)
+        if self.futility or self.razoring:
+            print("Futility-pruned moves: " + str(self.futilityCount) + ", razored nodes: " + str(self.razorCount))
+            print("Pruned levels: " , end="")
+            print(self.prunedLevels)
         print("Leaf count: " + str(self.leafCount))
+        print("Unbuilt successors: " + str(self.unbuiltCount))
+        if self.engine == 'pvs':
+            print("Re-searches: " + str(self.researchCount))
+        if self.aspiration > 0:
+            print("Aspiration re-searches: " + str(self.aspirationResearches))
+        if self.null_move:
+            print("Null-move cuts: " + str(self.nullCutCount) + " of " + str(self.nullTryCount) + " tries (" + str(self.nullVerifyFailCount) + " failed verifications)")
+        if self.lmr:
+            print("Late-move reductions: " + str(self.lmrCount) + " (" + str(self.lmrResearchCount) + " re-searches)")
+        if self.quiescence:
+            print("Quiescence nodes: " + str(self.qNodeCount) + " (" + str(self.deltaPruneCount) + " delta prunes)")
+        print("Duplicates removed: " + str(self.chain_cache.duplicates) + " (" + str(self.chain_cache.duplicates/self.expansionCount) + " per node)")
+        print("Chain cache hits: " + str(self.chain_cache.hits) + " (" + str(self.chain_cache.misses) + " misses)")
+        if self.tt is not None:
+            self.tt.print_stats()
+        if self.time_ms is not None or self.nodes is not None or self.parallel == 'smp':
+            print("Depth reached: " + str(self.depthReached))
+        if self.splitCount > 0:
+            print("Split points: " + str(self.splitCount) + ", speculative nodes: " + str(self.speculativeCount) + " (" + str(self.wastedCount) + " wasted, " + str(self.abortedCount) + " aborted brothers)")
+        if self.workers > 1:
+            print("Nodes/sec: " + str((self.expansionCount + self.leafCount) / max(self.execTime, 1e-9)) + " (" + str(self.workers) + " workers)")
         print("Value: " + str(self.res))
         print(self.cutLevels)
 
-        return (self.execTime,self.expansionTotal/self.expansionCount,self.leafCount,self.cutCount,self.cutLevels)
+        return (self.execTime,self.expansionTotal/self.expansionCount,self.leafCount,self.cutCount,self.cutLevels,self.unbuiltCount,self.chain_cache.duplicates,
+                self.aspirationResearches,self.expansionCount + self.leafCount,self.qNodeCount,
+                self.prunedLevels,self.tt.reused if self.tt is not None else 0)
+
+    """"
+    Minimax with alpha-beta prunning. Prunning may be disabled. Successor states are built from the compact moves only when they are visited,
+    so the ones after a cut are never built. If streaming is enabled, the moves after a cut aren't generated either
+    """
+
+    """"
+    Iterative deepening. Searches to depth 1, 2, ... up to the maximum depth with max_value/min_value until the time or node budget runs out.
+    The best root move of each iteration is searched first in the next one (as are the best moves stored in the transposition table, if
+    enabled), and the move of the last completed iteration is returned. The first iteration is always completed.
+    """
+
+    def move_iterative(self, state, guess=None):
+
+        start = time.time()
+
+        moves = state.generate_moves(self.chain_cache)
+
+        # Update statistics
+        self.expansionCount += 1
+        self.expansionTotal += len(moves)
+
+        # No posssible successors (gameover) or a single one, no search needed
+        if len(moves) <= 1:
+            return self.unsearched_move(state, moves, guess)
+
+        result = self.deepen(state, moves, guess, 1, self.depth, start)
+
+        return result[0], state.apply(result[1])
+
+    def unsearched_move(self, state, moves, guess):
+
+        """
+        Value and successor of a root without moves (gameover, the state itself) or with a single one, which aren't searched. The value of a
+        single move is the guess if there is one, since it is used as the guess of the next move and the static evaluation isn't a search
+        value; otherwise it is the evaluation of the successor
+        """
+
+        self.depthReached = 0
+
+        if len(moves) == 0:
+            return self.evaluate(state, self.player), state
+
+        successor = state.apply(moves[0])
+
+        if guess is not None:
+            return guess, successor
+
+        return self.evaluate(successor, self.player), successor
+
+    def deepen(self, state, moves, guess, first_depth, max_depth, start):
+
+        """
+        Iterative deepening loop over the root moves, from first_depth to max_depth. Returns the value and best move of the last completed
+        iteration (the first one is always completed, unless the search is stopped from outside)
+        """
+
+        search_depth = self.depth
+        result = None
+
+        for depth in range(first_depth, max_depth + 1):
+
+            self.depth = depth
+
+            try:
+                value, best = self.aspiration_root(state, moves, depth, guess)
+            except SearchAborted:
+                break
+
+            result = value, moves[best]
+            guess = value
+            self.depthReached = depth
+
+            # Search the best move first in the next iteration
+            moves.insert(0, moves.pop(best))
+
+            # Budget checks only apply after the first iteration
+            if self.time_ms is not None:
+                self.deadline = start + self.time_ms / 1000
+            if self.nodes is not None:
+                self.node_limit = self.nodes
+
+            if self.budget_exceeded():
+                break
+
+        self.depth = search_depth
+        self.deadline = None
+        self.node_limit = None
+
+        return result
+
+    def move_root(self, state, guess=None):
+
+        """
+        Search starting at the root moves (principal variation search and/or aspiration windows)
+        """
+
+        moves = state.generate_moves(self.chain_cache)
+
+        # Update statistics
+        self.expansionCount += 1
+        self.expansionTotal += len(moves)
+
+        # No posssible successors (gameover)
+        if len(moves) == 0:
+            return self.evaluate(state, self.player), state
+
+        value, best = self.aspiration_root(state, moves, self.depth, guess)
+
+        return value, state.apply(moves[best])
+
+    def aspiration_root(self, state, moves, depth, guess):
+
+        """
+        Search the root moves with an aspiration window around guess, widened until the value falls inside it (full window if aspiration
+        windows are disabled or there is no guess). Returns the value and the index of the best move
+        """
+
+        if self.aspiration <= 0 or guess is None:
+            return self.root_value(state, moves, depth)
+
+        delta = self.aspiration
+        alpha = guess - delta
+        beta = guess + delta
+
+        while True:
+            value, best = self.root_value(state, moves, depth, alpha, beta)
+
+            # Fail-low, widen the window downwards
+            if value <= alpha:
+                alpha = value - delta
+            # Fail-high, widen the window upwards
+            elif value >= beta:
+                beta = value + delta
+            else:
+                return value, best
+
+            self.aspirationResearches += 1
+            delta *= self.aspiration_growth
+
+    def root_value(self, state, moves, depth, alpha=-float("inf"), beta=float("inf")):
+
+        """
+        Search the root moves (max's turn) to the given depth and window. Returns the value and the index of the best move (the value is only a
+        bound if it is outside the window)
+        """
+
+        if self.engine == 'pvs':
+            return self.pvs_root(state, moves, depth, alpha, beta)
+
+        value = -float("inf")
+        best = None
+
+        for idx, move in enumerate(moves):
+
+            # Evaluate min's turn
+            min_v = self.min_value(state.apply(move), alpha, beta, depth - 1, move)[0]
+
+            # Update best move
+            if min_v > value:
+                value = min_v
+                best = idx
+
+            if value >= beta:
+                break
+
+            alpha = max([alpha,value])
+
+        return value, best
+
+    """"
+    Root-parallel search. The root moves are split among worker processes, each one with its own Minmax. The best value found so far at the
+    root is shared by the workers, and each root move is searched with a window that starts just below it: moves that can't be better are
+    cut sooner, and the ones that tie with the best get exact values, so the first best move is chosen as in the sequential search.
+    """
+
+    def worker_settings(self):
+
+        """
+        Constructor arguments of the Minmax of each worker (a fixed-depth sequential search with the same settings)
+        """
+
+        return {'depth': self.depth, 'player': self.player, 'eval_number': self.eval_number, 'use_cuts': self.use_cuts,
+                'use_state_ordering': self.use_state_ordering, 'streaming': self.streaming, 'tt_size': self.tt_size, 'engine': self.engine,
+                'ordering': self.ordering, 'quiescence': self.quiescence, 'q_nodes': self.q_nodes, 'null_move': self.null_move,
+                'verify_null': self.verify_null, 'lmr': self.lmr, 'futility': self.futility, 'razoring': self.razoring,
+                'aspiration': self.aspiration, 'aspiration_growth': self.aspiration_growth}
+
+    def move_parallel(self, state):
+
+        moves = state.generate_moves(self.chain_cache)
+
+        # Update statistics
+        self.expansionCount += 1
+        self.expansionTotal += len(moves)
+
+        # No posssible successors (gameover)
+        if len(moves) == 0:
+            return self.evaluate(state, self.player), state
+
+        shared_alpha = multiprocessing.Value('d', -math.inf)
+
+        with ProcessPoolExecutor(self.workers, initializer=init_root_worker, initargs=(self.worker_settings(), shared_alpha)) as pool:
+            futures = [pool.submit(search_root_move, state, move, self.depth) for move in moves]
+            results = [future.result() for future in futures]
+
+        best_value = -float("inf")
+        best = None
+
+        for idx, (value, exact, counts) in enumerate(results):
+
+            # Update statistics
+            self.add_counts(counts)
+
+            # Update best move (values that aren't exact are below the best one)
+            if exact and (best is None or value > best_value):
+                best_value = value
+                best = idx
+
+        return best_value, state.apply(moves[best])
+
+    def root_move_value(self, state, move, alpha, depth):
+
+        """
+        Value of a root move searched to the given depth with the window (alpha, inf). If it isn't above alpha, it is only an upper bound
+        """
+
+        return self.child_value(state, move, alpha, float("inf"), depth - 1, False)
+
+    def child_value(self, state, move, alpha, beta, depth, maximizing):
+
+        """
+        Value of the successor of the state by the move, searched to the given depth and window. maximizing is True if the successor is max's
+        turn
+        """
+
+        successor = state.apply(move)
+
+        if self.engine == 'pvs':
+            if maximizing:
+                return self.pvs(successor, alpha, beta, depth, 1, move)
+            return -self.pvs(successor, -beta, -alpha, depth, -1, move)
+
+        if maximizing:
+            return self.max_value(successor, alpha, beta, depth, move)[0]
+        return self.min_value(successor, alpha, beta, depth, move)[0]
+
+    def counts(self):
+
+        """
+        Search counters merged from the workers
+        """
+
+        return (self.expansionCount, self.expansionTotal, self.leafCount, self.cutCount, self.firstCutCount, self.unbuiltCount,
+                list(self.cutLevels), list(self.prunedLevels))
+
+    def add_counts(self, counts):
+
+        self.expansionCount += counts[0]
+        self.expansionTotal += counts[1]
+        self.leafCount += counts[2]
+        self.cutCount += counts[3]
+        self.firstCutCount += counts[4]
+        self.unbuiltCount += counts[5]
+        self.cutLevels = [a + b for a, b in zip(self.cutLevels, counts[6])]
+        self.prunedLevels = [a + b for a, b in zip(self.prunedLevels, counts[7])]
 
     """"
-    Minimax with alpha-beta prunning. Prunning may be disabled
+    Lazy SMP. All the processes search the same root with iterative deepening and share a transposition table, so each one profits from the
+    positions the others already searched. The helpers start at alternating depths and search the root moves in a rotated order, so they don't
+    all follow the same path. With a time or node budget, odd helpers go one level deeper than the maximum depth; otherwise they stop at it, so
+    a fixed-depth search always plays a move of that depth. Once the main process completes its search, the helpers are stopped and the
+    deepest completed result is played (the main one on ties). The table is kept for the next moves, as in the sequential search.
     """
 
-    def max_value(self,current_state,alpha,beta, depth):
+    def move_smp(self, state, guess=None):
+
+        start = time.time()
+
+        moves = state.generate_moves(self.chain_cache)
+
+        # Update statistics
+        self.expansionCount += 1
+        self.expansionTotal += len(moves)
+
+        # No posssible successors (gameover) or a single one, no search needed
+        if len(moves) <= 1:
+            return self.unsearched_move(state, moves, guess)
+
+        # The processes share a table in shared memory (the one filled while pondering, if any), which replaces the own one for good
+        if not isinstance(self.tt, SharedTranspositionTable):
+            if self.shared_tt is None:
+                self.shared_tt = SharedTranspositionTable(self.tt_size if self.tt_size > 0 else 16)
+            self.tt = self.shared_tt
+            self.tt.new_search()
+
+        stop = multiprocessing.RawValue('b', 0)
+
+        # Helpers may search one level deeper than the maximum depth only with a budget, and use the shared table instead of their own
+        settings = self.worker_settings()
+        if self.time_ms is not None or self.nodes is not None:
+            settings['depth'] = self.depth + 1
+        settings['tt_size'] = 0
+
+        with ProcessPoolExecutor(self.workers - 1, initializer=init_smp_worker, initargs=(settings, self.tt, stop)) as pool:
+            futures = [pool.submit(smp_search, state, moves, guess, helper) for helper in range(1, self.workers)]
+
+            result = self.deepen(state, moves, guess, 1, self.depth, start)
+            depth_reached = self.depthReached
+
+            stop.value = 1
+
+            for future in futures:
+                helper_depth, helper_result, counts = future.result()
+
+                # Update statistics
+                self.add_counts(counts)
+
+                if helper_result is not None and helper_depth > depth_reached:
+                    result = helper_result
+                    depth_reached = helper_depth
+
+        self.depthReached = depth_reached
+
+        return result[0], state.apply(result[1])
+
+    """"
+    Young Brothers Wait parallel alpha-beta. The first SPLIT_PLIES - 1 plies are searched by the main process, and every node of the next ply
+    is a split point: its eldest child is searched first, and only then are its younger brothers handed to the worker processes with the
+    window the eldest one left. Idle workers take the next waiting brother from the pool's shared queue. The best value found so far at the split
+    point is shared with the workers, so the brothers started later get tighter windows (starting just past it, so ties get exact values and
+    the first best move is chosen). When a brother causes a cut, the ones still waiting are cancelled and the ones in flight are aborted
+    through a shared flag. Full-width searches return the same value and move as the sequential search.
+    """
+
+    SPLIT_PLIES = 2
+    SPLIT_MIN_DEPTH = 3
+
+    def move_ybwc(self, state):
+
+        stop = multiprocessing.RawValue('b', 0)
+        bound = multiprocessing.RawValue('d', 0)
+
+        with ProcessPoolExecutor(self.workers, initializer=init_ybwc_worker, initargs=(self.worker_settings(), stop, bound)) as pool:
+            self.split_pool = pool, stop, bound
+
+            try:
+                return self.ybwc_max(state, -float("inf"), float("inf"), self.depth, 0)
+            finally:
+                self.split_pool = None
+
+    def ybwc_max(self, current_state, alpha, beta, depth, ply, prev_move=None):
+
+        # Nodes close to the leaves or past the split plies are searched sequentially
+        if depth < self.SPLIT_MIN_DEPTH or ply >= self.SPLIT_PLIES:
+            return self.max_value(current_state, alpha, beta, depth, prev_move)
+
+        moves = current_state.generate_moves(self.chain_cache)
+
+        # Update statistics
+        self.expansionCount += 1
+        self.expansionTotal += len(moves)
+
+        # No posssible successors (gameover)
+        if len(moves) == 0:
+            return self.evaluate(current_state, self.player), current_state
+
+        # Eldest brother
+        value = self.ybwc_min(current_state.apply(moves[0]), alpha, beta, depth - 1, ply + 1, moves[0])[0]
+        best = 0
+
+        if value >= beta and self.use_cuts:
+            self.cutCount += 1
+            self.firstCutCount += 1
+            self.cutLevels[self.depth - depth] += 1
+            self.unbuiltCount += len(moves) - 1
+        elif ply + 1 < self.SPLIT_PLIES:
+            alpha = max(alpha, value)
+
+            # Younger brothers, searched here (the nodes of the next plies are the split points)
+            for idx in range(1, len(moves)):
+                min_v = self.ybwc_min(current_state.apply(moves[idx]), alpha, beta, depth - 1, ply + 1, moves[idx])[0]
+
+                if min_v > value:
+                    value = min_v
+                    best = idx
+
+                if value >= beta and self.use_cuts:
+                    self.cutCount += 1
+                    self.cutLevels[self.depth - depth] += 1
+                    self.unbuiltCount += len(moves) - idx - 1
+                    break
+
+                alpha = max(alpha, value)
+        else:
+            # Younger brothers, searched by the workers
+            value, best = self.split(current_state, moves, max(alpha, value), beta, depth, value, True)
+
+        return value, current_state.apply(moves[best])
+
+    def ybwc_min(self, current_state, alpha, beta, depth, ply, prev_move=None):
+
+        # Nodes close to the leaves or past the split plies are searched sequentially
+        if depth < self.SPLIT_MIN_DEPTH or ply >= self.SPLIT_PLIES:
+            return self.min_value(current_state, alpha, beta, depth, prev_move)
+
+        moves = current_state.generate_moves(self.chain_cache)
+
+        # Update statistics
+        self.expansionCount += 1
+        self.expansionTotal += len(moves)
+
+        # No posssible successors (gameover)
+        if len(moves) == 0:
+            return self.evaluate(current_state, self.player), current_state
+
+        # Eldest brother
+        value = self.ybwc_max(current_state.apply(moves[0]), alpha, beta, depth - 1, ply + 1, moves[0])[0]
+        best = 0
+
+        if value <= alpha and self.use_cuts:
+            self.cutCount += 1
+            self.firstCutCount += 1
+            self.cutLevels[self.depth - depth] += 1
+            self.unbuiltCount += len(moves) - 1
+        elif ply + 1 < self.SPLIT_PLIES:
+            beta = min(beta, value)
+
+            # Younger brothers, searched here (the nodes of the next plies are the split points)
+            for idx in range(1, len(moves)):
+                max_v = self.ybwc_max(current_state.apply(moves[idx]), alpha, beta, depth - 1, ply + 1, moves[idx])[0]
+
+                if max_v < value:
+                    value = max_v
+                    best = idx
+
+                if value <= alpha and self.use_cuts:
+                    self.cutCount += 1
+                    self.cutLevels[self.depth - depth] += 1
+                    self.unbuiltCount += len(moves) - idx - 1
+                    break
+
+                beta = min(beta, value)
+        else:
+            # Younger brothers, searched by the workers
+            value, best = self.split(current_state, moves, alpha, min(beta, value), depth, value, False)
+
+        return value, current_state.apply(moves[best])
+
+    def split(self, current_state, moves, alpha, beta, depth, value, maximizing):
+
+        """
+        Search the younger brothers (moves[1:]) of a node in the worker processes, with the window left by the eldest one (whose value is
+        given). Returns the value of the node (a bound if it is cut) and the index of its best move
+        """
+
+        pool, stop, bound = self.split_pool
+        stop.value = 0
+        bound.value = alpha if maximizing else beta
+
+        futures = [pool.submit(search_brother, current_state, moves[idx], alpha, beta, depth - 1, maximizing) for idx in range(1, len(moves))]
+        indexes = {future: idx for idx, future in enumerate(futures, 1)}
+        best = 0
+        cut = False
+
+        # Update statistics
+        self.splitCount += 1
+
+        for future in as_completed(futures):
+
+            try:
+                brother_v, improves, counts = future.result()
+            except CancelledError:
+                self.abortedCount += 1
+                continue
+
+            # Update statistics
+            self.add_counts(counts)
+            nodes = counts[0] + counts[2]
+            self.speculativeCount += nodes
+
+            if cut or brother_v is None:
+                self.wastedCount += nodes
+                self.abortedCount += brother_v is None
+                continue
+
+            idx = indexes[future]
+
+            # Update best move (brothers that don't improve the window are only bounds, worse than the best one), the first one on ties
+            if improves and ((brother_v > value if maximizing else brother_v < value) or (brother_v == value and idx < best)):
+                value = brother_v
+                best = idx
+
+                if maximizing:
+                    bound.value = max(bound.value, value)
+                else:
+                    bound.value = min(bound.value, value)
+
+            # Execute prunning, stop the other brothers
+            if self.use_cuts and (value >= beta if maximizing else value <= alpha):
+                self.cutCount += 1
+                self.cutLevels[self.depth - depth] += 1
+                cut = True
+                stop.value = 1
+
+                for other in futures:
+                    other.cancel()
+
+        return value, best
+
+    def close(self):
+
+        """
+        Free the table in shared memory of the Lazy SMP searches, once this object searches no more moves
+        """
+
+        if self.shared_tt is not None:
+            if self.tt is self.shared_tt:
+                self.tt = None
+            self.shared_tt.release()
+            self.shared_tt = None
+
+    def budget_exceeded(self):
+
+        if self.stop is not None and self.stop.value:
+            return True
+
+        if self.node_limit is not None and self.expansionCount + self.leafCount >= self.node_limit:
+            return True
+
+        if self.deadline is not None and time.time() >= self.deadline:
+            return True
+
+        return False
+
+    def tt_lookup(self, current_state, alpha, beta, depth):
+
+        """
+        Look the state up in the transposition table. Returns its key, the value that ends the search of the node (None if the node must
+        be searched) and the stored best move (None if there is no entry). The root is always searched, since its best state is needed
+        """
+
+        key = current_state.get_key()
+        entry = self.tt.lookup(key)
+
+        if entry is None:
+            return key, None, None
+
+        value = None
+        if depth < self.depth:
+            if self.use_cuts:
+                value = self.tt.cutoff_value(entry, depth, alpha, beta)
+            elif entry[3] == TranspositionTable.EXACT:
+                value = self.tt.cutoff_value(entry, depth, alpha, beta)
+
+        return key, value, entry[4]
+
+    def ordered_stream(self, current_state, moves, first_moves):
+
+        """
+        Streamed moves with the given ones first (the best move stored in the transposition table, killer moves, ...), those that are legal in
+        the node: a table entry may be another position's after a key collision, or torn in a shared table, and killer moves come from other
+        nodes. The generator is started before the moves are checked and applied, since that's when a state with mandatory captures is switched
+        to the CAPT flag
+        """
+
+        first = next(moves, None)
+        yielded = []
+
+        for move in first_moves:
+            if move is not None and move not in yielded and current_state.has_move(move, self.chain_cache, True):
+                yielded.append(move)
+                yield move
+
+        if first is not None and first not in yielded:
+            yield first
+
+        for move in moves:
+            if move not in yielded:
+                yield move
+
+    def node_moves(self, current_state, depth, tt_move, prev_move):
+
+        """
+        Moves of a node in the order they are searched, and True if they are streamed (generated one at a time, only until a cut) or False if
+        they are a list. The best move stored in the transposition table is always searched first.
+        """
+
+        # Dynamic ordering far from the leaves, where sorting by the static evaluation of the successors pays off
+        if self.dynamic_ordering and depth >= self.STATIC_ORDER_DEPTH:
+            moves = current_state.generate_moves(self.chain_cache)
+            self.expansionTotal += len(moves)
+            return self.order_moves(current_state, moves, depth, tt_move, prev_move), False
+
+        # Dynamic ordering close to the leaves. The moves are streamed, the ones that caused cuts before (if legal in the node) first
+        if self.dynamic_ordering:
+            killers = self.killers[self.depth - depth]
+            counter = self.counters[self.move_index(prev_move)] if prev_move else None
+            return self.ordered_stream(current_state, current_state.iter_moves(self.chain_cache), [tt_move, killers[0], killers[1], counter]), True
+
+        if self.streaming:
+            moves = current_state.iter_moves(self.chain_cache)
+
+            if tt_move is not None:
+                moves = self.ordered_stream(current_state, moves, [tt_move])
+
+            return moves, True
+
+        moves = current_state.generate_moves(self.chain_cache)
+        self.expansionTotal += len(moves)
+
+        if tt_move is not None and tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        return moves, False
+
+    """
+    Dynamic move ordering (experimental: it is only faster than the evaluation ordering in some settings, see test_scripts/benchmark.py
+    bench_ordering). In nodes STATIC_ORDER_DEPTH or more plies above the leaves, moves are sorted by: best move in the transposition table,
+    static evaluation of the successor for the player to move, and then, only to break ties, captures (by the number of tiles of the move, so
+    the longer capture chains go first), killer moves (the last two moves that caused a cut in the same ply), counter-move (the last move that
+    caused a cut after the previous move) and history (sum of depth^2 of the cuts caused by moves with the same (from, to) tiles). Closer to
+    the leaves, evaluating every successor costs more than it saves: the moves are streamed in generation order, with the table move, the
+    killer moves and the counter-move lifted to the front.
+    """
+
+    STATIC_ORDER_DEPTH = 3
+
+    def move_index(self, move):
+
+        """
+        Index of the (from, to) tiles of a compact move in the history and counter-move tables
+        """
+
+        return move[0] * 64 + move[1 if len(move) > 1 else 0]
+
+    def order_moves(self, current_state, moves, depth, tt_move, prev_move):
+
+        killers = self.killers[self.depth - depth]
+        counter = self.counters[self.move_index(prev_move)] if prev_move else None
+        history = self.history
+
+        # Static evaluation of the successors, from the point of view of the player to move
+        sign = 1 if current_state.curr_player == self.player else -1
+        static = {move: sign * self.evaluate(current_state.apply(move), self.player) for move in moves}
+
+        # Captures are mandatory, so either every move of the node is a capture or none is
+        captures = current_state.next_move == current_state.CAPT
+
+        moves.sort(key=lambda move: (move == tt_move, static[move], len(move) if captures else 0, move in killers, move == counter,
+                                     history[self.move_index(move)]), reverse=True)
+
+        return moves
+
+    def update_ordering(self, move, idx, depth, prev_move):
+
+        """
+        Record a cut caused by the idx-th move searched in a node
+        """
+
+        # Update statistics
+        if idx == 0:
+            self.firstCutCount += 1
+
+        if not self.dynamic_ordering:
+            return
+
+        killers = self.killers[self.depth - depth]
+        if move != killers[0]:
+            killers[1] = killers[0]
+            killers[0] = move
+
+        self.history[self.move_index(move)] += depth * depth
+
+        if prev_move:
+            self.counters[self.move_index(prev_move)] = move
+
+    """
+    Selective search. Null-move pruning: the player to move passes and the opponent's reply is searched NULL_REDUCTION plies shallower with a
+    null window at the bound; if the player still reaches the bound, the node is pruned (after a verification search of the node itself,
+    also reduced, if verify_null is set). Only for FREE states without mandatory captures, never twice in a row nor at the root. Late-move
+    reductions: from the LMR_MOVES-th move on, moves that aren't captures nor chains are searched one ply shallower (two from the
+    LMR_LATE_MOVES-th move on) with a null window, and searched again with the full depth only if they turn out to be better than the best
+    move so far.
+    """
+
+    NULL_REDUCTION = 2
+    NULL_MOVE = ()                      # prev_move of the state after a null move
+    LMR_MOVES = 3
+    LMR_MIN_DEPTH = 3
+    LMR_LATE_MOVES = 6
+
+    def null_move_allowed(self, current_state, depth, bound, prev_move):
+
+        return (self.null_move and depth < self.depth and depth > self.NULL_REDUCTION and abs(bound) != float("inf")
+                and prev_move != self.NULL_MOVE and current_state.next_move == current_state.FREE and not current_state.must_capture())
+
+    def reduction(self, current_state, move, idx, depth):
+
+        """
+        Plies the idx-th move of a node is reduced by, 0 if it isn't (the moves are already generated, so the state has the CAPT flag if captures
+        are mandatory)
+        """
+
+        if (not self.lmr or idx < self.LMR_MOVES or depth < self.LMR_MIN_DEPTH or len(move) != 2
+                or current_state.next_move == current_state.CAPT):
+            return 0
+
+        return 1 if idx < self.LMR_LATE_MOVES else 2
+
+    """
+    Frontier pruning, for positions at the start of a turn without mandatory captures (captures and forced sequences are never pruned) whose
+    static evaluation is far from the window. Futility pruning (depths 1-2): if the evaluation plus a margin can't reach alpha (max's turn) or
+    the evaluation minus the margin can't reach beta (min's turn), the plain moves are skipped and only the chains are searched. Razoring
+    (depths 2-3): with a wider margin, the position is first searched one ply shallower with a null window, and pruned if it fails there too.
+    Margins are given by depth for each evaluation function, since their scales differ.
+    """
+
+    FUTILITY_MARGINS = {1: [0, 4, 8], 2: [0, 5, 10], 3: [0, 5, 10], 4: [0, 5, 10]}
+    RAZOR_MARGINS = {1: [0, 0, 8, 12], 2: [0, 0, 10, 15], 3: [0, 0, 10, 15], 4: [0, 0, 10, 15]}
+
+    def frontier_pruning_allowed(self, current_state, depth):
+
+        return ((self.futility or self.razoring) and depth <= 3 and depth < self.depth
+                and current_state.next_move == current_state.FREE and not current_state.must_capture())
+
+    def futility_margin(self, depth):
+
+        return self.FUTILITY_MARGINS[self.eval_number][depth] if self.futility and depth <= 2 else None
+
+    def razor_margin(self, depth):
+
+        return self.RAZOR_MARGINS[self.eval_number][depth] if self.razoring and depth >= 2 else None
+
+    def max_value(self,current_state,alpha,beta, depth, prev_move=None):
+
+        # Leaf node reached
+        if depth == 0:
+            self.leafCount += 1
+            if self.quiescence:
+                self.q_budget = self.q_nodes
+                return self.max_quiescence(current_state, alpha, beta), current_state
+            return self.evaluate(current_state, self.player), current_state
+
+        # Abort an iterative deepening iteration once the budget runs out
+        if (self.deadline is not None or self.node_limit is not None) and self.budget_exceeded():
+            raise SearchAborted()
+
+        # Transposition table lookup
+        tt_move = None
+        if self.tt is not None:
+            key, tt_value, tt_move = self.tt_lookup(current_state, alpha, beta, depth)
+
+            if tt_value is not None:
+                return tt_value, current_state
+
+        # Null-move pruning
+        if self.null_move_allowed(current_state, depth, beta, prev_move):
+            self.nullTryCount += 1
+            null_v = self.min_value(current_state.null_move(), self.null_window_below(beta), beta, depth - 1 - self.NULL_REDUCTION, self.NULL_MOVE)[0]
+
+            if null_v >= beta:
+                if self.verify_null and self.max_value(current_state, self.null_window_below(beta), beta, depth - self.NULL_REDUCTION, prev_move)[0] < beta:
+                    self.nullVerifyFailCount += 1
+                else:
+                    self.nullCutCount += 1
+                    return null_v, current_state
+
+        alpha_orig = alpha
+        value = -float("inf")
+
+        # Razoring and futility pruning
+        futile = False
+        if self.frontier_pruning_allowed(current_state, depth):
+            static = self.evaluate(current_state, self.player)
+            razor_margin = self.razor_margin(depth)
+            futility_margin = self.futility_margin(depth)
+
+            if razor_margin is not None and static + razor_margin <= alpha:
+                razor_v = self.max_value(current_state, alpha, self.null_window(alpha), depth - 1, prev_move)[0]
 
-        # Leaf node reached
-        if depth == 0:
-            self.leafCount += 1
-            return self.evaluate(current_state, self.player), current_state
+                if razor_v <= alpha:
+                    self.razorCount += 1
+                    self.prunedLevels[self.depth - depth] += 1
+                    return razor_v, current_state
 
-        value = -float("inf")
+            # Plain moves can't raise the value above static + margin
+            if futility_margin is not None and static + futility_margin <= alpha:
+                futile = True
+                value = static + futility_margin
 
-        # Expand current state (obtain all possible resultant gamestates)
-        expanded_states = current_state.exec_all_moves(1)
+        # Get all possible moves (resultant gamestates are only built when visited)
+        moves, streamed = self.node_moves(current_state, depth, tt_move, prev_move)
 
         # Update statistics
         self.expansionCount += 1
-        self.expansionTotal += len(expanded_states)
 
-        # State that obtained the max value
+        # State (and move) that obtained the max value
         current_max_state = None
+        best_move = None
 
-        # No posssible successors (gameover)
-        if len(expanded_states) == 0:
-            return self.evaluate(current_state, self.player), current_state
+        for idx, move in enumerate(moves):
 
-        for state in expanded_states:
+            if streamed:
+                self.expansionTotal += 1
 
-            # Evaluate min's turn
-            min_v = self.min_value(state, alpha, beta, depth - 1)[0]
+            # Futility pruning (chains are always searched)
+            if futile and len(move) == 2:
+                self.futilityCount += 1
+                self.prunedLevels[self.depth - depth] += 1
+                continue
+
+            state = current_state.apply(move)
+
+            # Late move, search it with a reduced depth first
+            reduction = self.reduction(current_state, move, idx, depth)
+            if reduction:
+                self.lmrCount += 1
+                min_v = self.min_value(state, alpha, self.null_window(alpha), depth - 1 - reduction, move)[0]
+
+                if min_v > alpha:
+                    self.lmrResearchCount += 1
+                    min_v = self.min_value(state, alpha, beta, depth - 1, move)[0]
+            else:
+                # Evaluate min's turn
+                min_v = self.min_value(state, alpha, beta, depth - 1, move)[0]
 
             # Update best state
             if min_v > value :
                 current_max_state = state
+                best_move = move
                 value = min_v
 
             # Execute prunning
@@ -106,55 +1083,433 @@ class Minmax:
 
                 self.cutCount +=1
                 self.cutLevels[self.depth - depth] += 1
+                self.update_ordering(move, idx, depth, prev_move)
+                if not streamed:
+                    self.unbuiltCount += len(moves) - idx - 1
+                if self.tt is not None:
+                    self.tt.put(key, value, depth, TranspositionTable.LOWER, best_move)
                 return value, current_max_state
 
             alpha = max([alpha,value])
 
+        # No posssible successors (gameover), unless the moves were pruned
+        if current_max_state is None:
+            if not futile:
+                value = self.evaluate(current_state, self.player)
+            current_max_state = current_state
+
+        if self.tt is not None:
+            bound = TranspositionTable.UPPER if value <= alpha_orig and self.use_cuts else TranspositionTable.EXACT
+            self.tt.put(key, value, depth, bound, best_move)
+
         return value, current_max_state
 
-    def min_value(self,current_state,alpha,beta, depth):
+    def min_value(self,current_state,alpha,beta, depth, prev_move=None):
 
         # Leaf node reached
         if depth == 0:
             self.leafCount += 1
+            if self.quiescence:
+                self.q_budget = self.q_nodes
+                return self.min_quiescence(current_state, alpha, beta), current_state
             return self.evaluate(current_state, self.player), current_state
 
+        # Abort an iterative deepening iteration once the budget runs out
+        if (self.deadline is not None or self.node_limit is not None) and self.budget_exceeded():
+            raise SearchAborted()
+
+        # Transposition table lookup
+        tt_move = None
+        if self.tt is not None:
+            key, tt_value, tt_move = self.tt_lookup(current_state, alpha, beta, depth)
+
+            if tt_value is not None:
+                return tt_value, current_state
+
+        # Null-move pruning
+        if self.null_move_allowed(current_state, depth, alpha, prev_move):
+            self.nullTryCount += 1
+            null_v = self.max_value(current_state.null_move(), alpha, self.null_window(alpha), depth - 1 - self.NULL_REDUCTION, self.NULL_MOVE)[0]
+
+            if null_v <= alpha:
+                if self.verify_null and self.min_value(current_state, alpha, self.null_window(alpha), depth - self.NULL_REDUCTION, prev_move)[0] > alpha:
+                    self.nullVerifyFailCount += 1
+                else:
+                    self.nullCutCount += 1
+                    return null_v, current_state
+
+        beta_orig = beta
         value = float("inf")
 
-        # Expand current state (obtain all possible resultant gamestates)
-        expanded_states = current_state.exec_all_moves(1)
+        # Razoring and futility pruning
+        futile = False
+        if self.frontier_pruning_allowed(current_state, depth):
+            static = self.evaluate(current_state, self.player)
+            razor_margin = self.razor_margin(depth)
+            futility_margin = self.futility_margin(depth)
+
+            if razor_margin is not None and static - razor_margin >= beta:
+                razor_v = self.min_value(current_state, self.null_window_below(beta), beta, depth - 1, prev_move)[0]
+
+                if razor_v >= beta:
+                    self.razorCount += 1
+                    self.prunedLevels[self.depth - depth] += 1
+                    return razor_v, current_state
+
+            # Plain moves can't lower the value below static - margin
+            if futility_margin is not None and static - futility_margin >= beta:
+                futile = True
+                value = static - futility_margin
+
+        # Get all possible moves (resultant gamestates are only built when visited)
+        moves, streamed = self.node_moves(current_state, depth, tt_move, prev_move)
 
         # Update statistics
         self.expansionCount += 1
-        self.expansionTotal += len(expanded_states)
 
-        # State that obtained the minumum value
+        # State (and move) that obtained the minumum value
         current_min_state = None
+        best_move = None
 
-        # No posssible successors (gameover)
-        if len(expanded_states) == 0:
-            return self.evaluate(current_state, self.player), current_state
+        for idx, move in enumerate(moves):
 
-        for state in expanded_states:
+            if streamed:
+                self.expansionTotal += 1
 
-            # Evaluate max's turn
-            max_v =  self.max_value(state, alpha, beta, depth - 1)[0]
+            # Futility pruning (chains are always searched)
+            if futile and len(move) == 2:
+                self.futilityCount += 1
+                self.prunedLevels[self.depth - depth] += 1
+                continue
+
+            state = current_state.apply(move)
+
+            # Late move, search it with a reduced depth first
+            reduction = self.reduction(current_state, move, idx, depth)
+            if reduction:
+                self.lmrCount += 1
+                max_v = self.max_value(state, self.null_window_below(beta), beta, depth - 1 - reduction, move)[0]
+
+                if max_v < beta:
+                    self.lmrResearchCount += 1
+                    max_v = self.max_value(state, alpha, beta, depth - 1, move)[0]
+            else:
+                # Evaluate max's turn
+                max_v =  self.max_value(state, alpha, beta, depth - 1, move)[0]
 
             # Update best state
             if max_v < value:
                 current_min_state = state
+                best_move = move
                 value = max_v
 
             # Execute prunning
             if value <= alpha and self.use_cuts:
                 self.cutCount += 1
                 self.cutLevels[self.depth - depth] += 1
+                self.update_ordering(move, idx, depth, prev_move)
+                if not streamed:
+                    self.unbuiltCount += len(moves) - idx - 1
+                if self.tt is not None:
+                    self.tt.put(key, value, depth, TranspositionTable.UPPER, best_move)
                 return value, current_min_state
 
             beta = min([beta,value])
 
+        # No posssible successors (gameover), unless the moves were pruned
+        if current_min_state is None:
+            if not futile:
+                value = self.evaluate(current_state, self.player)
+            current_min_state = current_state
+
+        if self.tt is not None:
+            bound = TranspositionTable.LOWER if value >= beta_orig and self.use_cuts else TranspositionTable.EXACT
+            self.tt.put(key, value, depth, bound, best_move)
+
         return value,current_min_state
 
+    """"
+    Quiescence search. Leaves where the player to move has a pending (mandatory) capture are searched further, only until the positions are
+    quiet, so they aren't judged in the middle of an exchange. As in chess, the static evaluation (stand-pat) is taken as the value the
+    player to move can at least get, even though captures are mandatory in Eximo: capturing usually doesn't make the position worse. Delta
+    pruning skips the captures that can't bring the value back into the window even if every captured piece was worth DELTA_PIECE plus a
+    DELTA_MARGIN of positional gain, and the search of each leaf stops after q_nodes nodes.
+    """
+
+    DELTA_PIECE = 3.0
+    DELTA_MARGIN = 2.0
+
+    def max_quiescence(self, current_state, alpha, beta):
+
+        stand_pat = self.evaluate(current_state, self.player)
+
+        # Quiet position or node cap reached
+        if self.q_budget <= 0 or not current_state.must_capture():
+            return stand_pat
+
+        # Stand-pat
+        if stand_pat >= beta:
+            return stand_pat
+
+        value = stand_pat
+        alpha = max([alpha,value])
+
+        for move in current_state.iter_moves(self.chain_cache):
+
+            # Delta pruning (each hop of a capture chain takes a piece)
+            if stand_pat + (len(move) - 1) * self.DELTA_PIECE + self.DELTA_MARGIN <= alpha:
+                self.deltaPruneCount += 1
+                continue
+
+            if self.q_budget <= 0:
+                break
+
+            self.q_budget -= 1
+            self.qNodeCount += 1
+
+            # Evaluate min's turn
+            min_v = self.min_quiescence(current_state.apply(move), alpha, beta)
+
+            if min_v > value:
+                value = min_v
+
+            if value >= beta:
+                return value
+
+            alpha = max([alpha,value])
+
+        return value
+
+    def min_quiescence(self, current_state, alpha, beta):
+
+        stand_pat = self.evaluate(current_state, self.player)
+
+        # Quiet position or node cap reached
+        if self.q_budget <= 0 or not current_state.must_capture():
+            return stand_pat
+
+        # Stand-pat
+        if stand_pat <= alpha:
+            return stand_pat
+
+        value = stand_pat
+        beta = min([beta,value])
+
+        for move in current_state.iter_moves(self.chain_cache):
+
+            # Delta pruning (each hop of a capture chain takes a piece)
+            if stand_pat - (len(move) - 1) * self.DELTA_PIECE - self.DELTA_MARGIN >= beta:
+                self.deltaPruneCount += 1
+                continue
+
+            if self.q_budget <= 0:
+                break
+
+            self.q_budget -= 1
+            self.qNodeCount += 1
+
+            # Evaluate max's turn
+            max_v = self.max_quiescence(current_state.apply(move), alpha, beta)
+
+            if max_v < value:
+                value = max_v
+
+            if value <= alpha:
+                return value
+
+            beta = min([beta,value])
+
+        return value
+
+    """"
+    Principal variation search (NegaScout) in negamax form. Values are seen from the player to move (color is 1 on max's turns and -1 on
+    min's). The first move of each node is searched with the full window and the others with a null window, which only tells if they are
+    better than the best one so far; the ones that are (fail-high) are searched again with the full window. Returns the same value as
+    max_value/min_value.
+    """
+
+    def null_window_below(self, beta):
+
+        """
+        Lower limit of the null window below beta
+        """
+
+        return math.nextafter(beta, -math.inf)
+
+    def null_window(self, alpha):
+
+        """
+        Upper limit of the null window above alpha. Values are floats, so the window ends at the next float (a window with alpha == beta can't
+        tell a fail-low from a fail-high when the value is alpha)
+        """
+
+        return math.nextafter(alpha, math.inf)
+
+    def pvs_root(self, state, moves, depth, alpha=-float("inf"), beta=float("inf")):
+
+        """
+        Principal variation search of the root moves. Returns the value and the index of the best move
+        """
+
+        best_value = -float("inf")
+        best = None
+
+        for idx, move in enumerate(moves):
+
+            successor = state.apply(move)
+
+            if best is None:
+                value = -self.pvs(successor, -beta, -alpha, depth - 1, -1, move)
+            else:
+                # Null window
+                value = -self.pvs(successor, -self.null_window(alpha), -alpha, depth - 1, -1, move)
+
+                # Fail-high inside the window, search again with the full window
+                if alpha < value < beta:
+                    self.researchCount += 1
+                    value = -self.pvs(successor, -beta, -alpha, depth - 1, -1, move)
+
+            # Update best move
+            if best is None or value > best_value:
+                best_value = value
+                best = idx
+
+            if best_value >= beta:
+                break
+
+            alpha = max([alpha,best_value])
+
+        return best_value, best
+
+    def pvs(self, current_state, alpha, beta, depth, color, prev_move=None):
+
+        # Leaf node reached
+        if depth == 0:
+            self.leafCount += 1
+            if self.quiescence:
+                self.q_budget = self.q_nodes
+                if color == 1:
+                    return self.max_quiescence(current_state, alpha, beta)
+                return -self.min_quiescence(current_state, -beta, -alpha)
+            return color * self.evaluate(current_state, self.player)
+
+        # Abort an iterative deepening iteration once the budget runs out
+        if (self.deadline is not None or self.node_limit is not None) and self.budget_exceeded():
+            raise SearchAborted()
+
+        # Transposition table lookup (values are stored from the point of view of the player to move)
+        tt_move = None
+        if self.tt is not None:
+            key, tt_value, tt_move = self.tt_lookup(current_state, alpha, beta, depth)
+
+            if tt_value is not None:
+                return tt_value
+
+        # Null-move pruning
+        if self.null_move_allowed(current_state, depth, beta, prev_move):
+            self.nullTryCount += 1
+            null_v = -self.pvs(current_state.null_move(), -beta, self.null_window(-beta), depth - 1 - self.NULL_REDUCTION, -color, self.NULL_MOVE)
+
+            if null_v >= beta:
+                if self.verify_null and self.pvs(current_state, self.null_window_below(beta), beta, depth - self.NULL_REDUCTION, color, prev_move) < beta:
+                    self.nullVerifyFailCount += 1
+                else:
+                    self.nullCutCount += 1
+                    return null_v
+
+        alpha_orig = alpha
+        value = -float("inf")
+
+        # Razoring and futility pruning
+        futile = False
+        if self.frontier_pruning_allowed(current_state, depth):
+            static = color * self.evaluate(current_state, self.player)
+            razor_margin = self.razor_margin(depth)
+            futility_margin = self.futility_margin(depth)
+
+            if razor_margin is not None and static + razor_margin <= alpha:
+                razor_v = self.pvs(current_state, alpha, self.null_window(alpha), depth - 1, color, prev_move)
+
+                if razor_v <= alpha:
+                    self.razorCount += 1
+                    self.prunedLevels[self.depth - depth] += 1
+                    return razor_v
+
+            # Plain moves can't raise the value above static + margin
+            if futility_margin is not None and static + futility_margin <= alpha:
+                futile = True
+                value = static + futility_margin
+
+        # Get all possible moves (resultant gamestates are only built when visited)
+        moves, streamed = self.node_moves(current_state, depth, tt_move, prev_move)
+
+        # Update statistics
+        self.expansionCount += 1
+
+        # Move that obtained the best value
+        best_move = None
+
+        for idx, move in enumerate(moves):
+
+            if streamed:
+                self.expansionTotal += 1
+
+            # Futility pruning (chains are always searched)
+            if futile and len(move) == 2:
+                self.futilityCount += 1
+                self.prunedLevels[self.depth - depth] += 1
+                continue
+
+            state = current_state.apply(move)
+
+            if best_move is None:
+                score = -self.pvs(state, -beta, -alpha, depth - 1, -color, move)
+            else:
+                # Late move, null window with a reduced depth first
+                reduction = self.reduction(current_state, move, idx, depth)
+                if reduction:
+                    self.lmrCount += 1
+                    score = -self.pvs(state, -self.null_window(alpha), -alpha, depth - 1 - reduction, -color, move)
+
+                # Null window
+                if not reduction or score > alpha:
+                    if reduction:
+                        self.lmrResearchCount += 1
+                    score = -self.pvs(state, -self.null_window(alpha), -alpha, depth - 1, -color, move)
+
+                # Fail-high inside the window, search again with the full window
+                if alpha < score < beta:
+                    self.researchCount += 1
+                    score = -self.pvs(state, -beta, -alpha, depth - 1, -color, move)
+
+            # Update best move
+            if score > value:
+                value = score
+                best_move = move
+
+            # Execute prunning
+            if value >= beta:
+                self.cutCount += 1
+                self.cutLevels[self.depth - depth] += 1
+                self.update_ordering(move, idx, depth, prev_move)
+                if not streamed:
+                    self.unbuiltCount += len(moves) - idx - 1
+                if self.tt is not None:
+                    self.tt.put(key, value, depth, TranspositionTable.LOWER, best_move)
+                return value
+
+            alpha = max([alpha,value])
+
+        # No posssible successors (gameover), unless the moves were pruned
+        if best_move is None and not futile:
+            value = color * self.evaluate(current_state, self.player)
+
+        if self.tt is not None:
+            bound = TranspositionTable.UPPER if value <= alpha_orig else TranspositionTable.EXACT
+            self.tt.put(key, value, depth, bound, best_move)
+
+        return value
+
     """"
     Minimax using move ordering and alpha-beta prunning. Uses heaps to order the child states by there evaluation result, this is done in order to better understand
     what would be the bext next move to explore.
@@ -165,7 +1520,7 @@ class Minmax:
         value = -float("inf")
 
         # Expand current state (obtain all possible resultant gamestates)
-        expanded_states = current_state.exec_all_moves(1)
+        expanded_states = current_state.exec_all_moves(1, self.chain_cache)
 
         # Evaluate tuples and build heap nodes
         for i in range(len(expanded_states)):
@@ -185,6 +1540,8 @@ class Minmax:
         if len(expanded_states) == 0:
             return self.evaluate(current_state, self.player), current_state
 
+        searched = 0
+
         while len(expanded_states) > 0:
 
             # Get next state
@@ -209,9 +1566,12 @@ class Minmax:
             if value >= beta and self.use_cuts:
                 self.cutCount +=1
                 self.cutLevels[self.depth - depth] += 1
+                if searched == 0:
+                    self.firstCutCount += 1
                 return value, current_max_state
 
             alpha = max([alpha,value])
+            searched += 1
 
         return value, current_max_state
 
@@ -220,7 +1580,7 @@ class Minmax:
         value = float("inf")
 
         # Expand current state (obtain all possible resultant gamestates)
-        expanded_states = current_state.exec_all_moves(1)
+        expanded_states = current_state.exec_all_moves(1, self.chain_cache)
 
         # Evaluate tuples and build heap nodes
         for i in range(len(expanded_states)):
@@ -239,6 +1599,8 @@ class Minmax:
         if len(expanded_states) == 0:
             return self.evaluate(current_state, self.player), current_state
 
+        searched = 0
+
         while len(expanded_states) > 0:
 
             # Get next state
@@ -263,135 +1625,292 @@ class Minmax:
             if value <= alpha and self.use_cuts:
                 self.cutCount += 1
                 self.cutLevels[self.depth - depth] += 1
+                if searched == 0:
+                    self.firstCutCount += 1
                 return value, current_min_state
 
             beta = min([beta,value])
+            searched += 1
 
         return value,current_min_state
 
+    """"
+    Minimax with alpha-beta prunning over a single mutable state. Operations are applied with make_move and reverted with unmake_move, so no
+    state is built per node. Successive jumps/captures/piece additions by the same player are searched at the same depth. Instead of the best
+    state, the functions return the operations that lead to it (until the end of the player's turn).
+    """
+
+    def move_inplace(self, state):
+
+        # Search over a copy, the given state is left untouched
+        work_state = state.copy()
+        value, path = self.max_value_inplace(work_state, -float("inf"), float("inf"), self.depth)
+
+        # Build the chosen successor (work_state was reverted to the root, with its flags updated by operations())
+        for operation in path:
+            work_state.make_move(operation)
+
+        return value, work_state if path else state
+
+    def inplace_operations(self, current_state, maximize):
+
+        operations = current_state.operations()
+
+        # Order the operations by the evaluation of the state they lead to
+        if self.use_state_ordering:
+            scores = []
+
+            for operation in operations:
+                undo = current_state.make_move(operation)
+                scores.append(self.evaluate(current_state, self.player))
+                current_state.unmake_move(undo)
+
+            order = sorted(range(len(operations)), key=lambda i: scores[i], reverse=maximize)
+            operations = [operations[i] for i in order]
+
+        return operations
+
+    def max_value_inplace(self, current_state, alpha, beta, depth):
+
+        # Leaf node reached
+        if depth == 0:
+            self.leafCount += 1
+            return self.evaluate(current_state, self.player), []
+
+        value = -float("inf")
+
+        # Operations that may be applied to the current state
+        operations = self.inplace_operations(current_state, True)
+
+        # Update statistics
+        self.expansionCount += 1
+        self.expansionTotal += len(operations)
+
+        # Operations that obtained the max value
+        current_max_path = []
+
+        # No posssible successors (gameover)
+        if len(operations) == 0:
+            return self.evaluate(current_state, self.player), []
+
+        player = current_state.curr_player
+
+        for operation in operations:
+
+            undo = current_state.make_move(operation)
+
+            # Same player keeps playing, otherwise evaluate min's turn
+            if current_state.curr_player == player:
+                min_v, path = self.max_value_inplace(current_state, alpha, beta, depth)
+            else:
+                min_v, path = self.min_value_inplace(current_state, alpha, beta, depth - 1)
+                path = []
+
+            current_state.unmake_move(undo)
+
+            # Update best operations
+            if min_v > value :
+                current_max_path = [operation] + path
+                value = min_v
+
+            # Execute prunning
+            if value >= beta and self.use_cuts:
+                self.cutCount +=1
+                self.cutLevels[self.depth - depth] += 1
+                return value, current_max_path
+
+            alpha = max([alpha,value])
+
+        return value, current_max_path
+
+    def min_value_inplace(self, current_state, alpha, beta, depth):
+
+        # Leaf node reached
+        if depth == 0:
+            self.leafCount += 1
+            return self.evaluate(current_state, self.player), []
+
+        value = float("inf")
+
+        # Operations that may be applied to the current state
+        operations = self.inplace_operations(current_state, False)
+
+        # Update statistics
+        self.expansionCount += 1
+        self.expansionTotal += len(operations)
+
+        # Operations that obtained the minimum value
+        current_min_path = []
+
+        # No posssible successors (gameover)
+        if len(operations) == 0:
+            return self.evaluate(current_state, self.player), []
+
+        player = current_state.curr_player
+
+        for operation in operations:
+
+            undo = current_state.make_move(operation)
+
+            # Same player keeps playing, otherwise evaluate max's turn
+            if current_state.curr_player == player:
+                max_v, path = self.min_value_inplace(current_state, alpha, beta, depth)
+            else:
+                max_v, path = self.max_value_inplace(current_state, alpha, beta, depth - 1)
+                path = []
+
+            current_state.unmake_move(undo)
+
+            # Update best operations
+            if max_v < value:
+                current_min_path = [operation] + path
+                value = max_v
+
+            # Execute prunning
+            if value <= alpha and self.use_cuts:
+                self.cutCount += 1
+                self.cutLevels[self.depth - depth] += 1
+                return value, current_min_path
+
+            beta = min([beta,value])
+
+        return value, current_min_path
+
+
+"""
+Root-parallel search workers. Each worker process keeps a Minmax with the settings of the searching one, and the best value found so far at
+the root in shared memory
+"""
+
+root_worker = None
+root_alpha = None
+
+def init_root_worker(settings, shared_alpha):
+
+    global root_worker, root_alpha
+
+    root_worker = Minmax(**settings)
+    root_alpha = shared_alpha
+
+def search_root_move(state, move, depth):
+
     """
-    Evaluation functions used for the minimax search. These functions return a numeric value of the given board (higher values signify a good gamestate)
-    The evaluation is made according to the player given as an argument
+    Search a root move in a worker. Returns its value, True if it is exact (False if it is only an upper bound, below the best value found
+    so far) and the counters of the search
     """
 
-    def eval1(self, state, player_perspective):
-        enemy = state.get_enemy(player_perspective)
-
-        pieces_count = 0
-        enemypieces_count = 0
-        dist_sum = 0
-
-        for row in range(1, 9):
-            for column in range(1, 9):
-                if(state.board.get_element(column, row) == player_perspective):
-                    pieces_count += 1
-                    if(player_perspective == 1):
-                        dist_sum += (9 - row)
-                    else:
-                        dist_sum += row
-                elif(state.board.get_element(column, row) == enemy):
-                    enemypieces_count += 1
-
-        # pieces = self.board.normalized_pieces(player_perspective)
-        # enemypieces = self.board.pieces(self.get_enemy(player_perspective))
-        # distances = [y for (_, y) in pieces]
-        random_factor = id(state) // 1000 % 3
-
-        # return sum(distances) + (len(pieces) - len(enemypieces)) + random_factor #+ self.board.column_control(player_perspective)
-        # print("Dist: " + str(dist_sum) + "\t Piece Diff: " + str(pieces_count - enemypieces_count))
-        return dist_sum + (pieces_count - enemypieces_count) + random_factor #+ self.board.column_control(player_perspective)
-
-    def eval2(self, state, player_perspective):
-        enemy = state.get_enemy(player_perspective)
-
-        pieces_count = 0
-        enemypieces_count = 0
-        dist_sum = 0
-        out_columns_player = 0
-        out_columns_enemy = 0
-
-
-        for row in range(1, 9):
-            for column in range(1, 9):
-                if(column == 1 or column == 8):
-                    if(state.board.get_element(column, row) == player_perspective):
-                        out_columns_player += 1
-                    elif(state.board.get_element(column, row) == enemy):
-                        out_columns_enemy += 1
-                if(state.board.get_element(column, row) == player_perspective):
-                    pieces_count += 1
-                    if(player_perspective == 1):
-                        dist_sum += (9 - row)
-                    else:
-                        dist_sum += row
-                elif(state.board.get_element(column, row) == enemy):
-                    enemypieces_count += 1
-
-        random_factor = id(state) // 1000 % 3
-
-        return dist_sum/3.0 + (pieces_count - enemypieces_count)*3.0 + (out_columns_player)*2 + random_factor
-
-    def eval3(self, state, player_perspective):
-        enemy = state.get_enemy(player_perspective)
-
-        pieces_count = 0
-        enemypieces_count = 0
-        dist_sum = 0
-        out_columns_player = 0
-        out_columns_enemy = 0
-
-
-        for row in range(1, 9):
-            for column in range(1, 9):
-                if(column == 1 or column == 8):
-                    if(state.board.get_element(column, row) == player_perspective):
-                        out_columns_player += 1
-                    elif(state.board.get_element(column, row) == enemy):
-                        out_columns_enemy += 1
-                if(state.board.get_element(column, row) == player_perspective):
-                    pieces_count += 1
-                    if(player_perspective == 1):
-                        dist_sum += (9 - row)
-                    else:
-                        dist_sum += row
-                elif(state.board.get_element(column, row) == enemy):
-                    enemypieces_count += 1
-
-        random_factor = id(state) // 1000 % 3
-
-        return dist_sum/3.0 + (pieces_count - enemypieces_count)*3.0 + (out_columns_player- out_columns_enemy)*2.3 + random_factor
-
-    def eval4(self, state, player_perspective):
-        enemy = state.get_enemy(player_perspective)
-
-        pieces_count = 0
-        enemypieces_count = 0
-        dist_sum = 0
-
-        center = 0
-
-        for row in range(1, 9):
-            for column in range(1, 9):
-                piece = state.board.get_element(column, row)
-                if not piece == player_perspective:
-                    continue
-                if column == 1 or column == 8:
-                    center += 9
-                elif column == 2 or column == 7:
-                    center += 1
-                elif column == 3 or column == 6:
-                    center += 2
-                elif column == 5 or column == 4:
-                    center += 4.5
-
-                # player 1
-                if player_perspective == 1:
-                    dist_sum += (9 - row)
-                # player 2
-                else:
-                    dist_sum += row
+    before = root_worker.counts()
+
+    # Start the window just below the best value, so a move that ties with it gets an exact value
+    alpha = root_alpha.value
+    if alpha != -math.inf:
+        alpha = math.nextafter(alpha, -math.inf)
+
+    value = root_worker.root_move_value(state, move, alpha, depth)
+
+    with root_alpha.get_lock():
+        if value > root_alpha.value:
+            root_alpha.value = value
+
+    after = root_worker.counts()
+    counts = tuple(b - a for a, b in zip(before[:6], after[:6]))
+    counts += ([b - a for a, b in zip(before[6], after[6])], [b - a for a, b in zip(before[7], after[7])])
+
+    return value, value > alpha, counts
+
+
+"""
+Lazy SMP helpers. Each helper process keeps a Minmax with the settings of the searching one, attached to the shared transposition table
+and stop flag
+"""
+
+smp_worker = None
+
+def init_smp_worker(settings, table, stop):
+
+    global smp_worker
+
+    smp_worker = Minmax(**settings)
+    smp_worker.tt = table
+    smp_worker.stop = stop
+
+def smp_search(state, moves, guess, helper):
+
+    """
+    Iterative deepening of a helper until it is stopped. Returns the depth reached, the value and best move of the deepest completed iteration
+    (None if none was) and the counters of the search
+    """
+
+    mm = smp_worker
+    before = mm.counts()
+
+    # Rotate the root moves and alternate the depths, so the helpers diverge
+    shift = helper % len(moves)
+    moves = moves[shift:] + moves[:shift]
+    max_depth = mm.depth - 1 + helper % 2
+
+    # The stop flag is only checked with a budget, so an unlimited one is given
+    mm.depthReached = 0
+    mm.nodes = float("inf")
+
+    result = None
+    if not mm.stop.value:
+        result = mm.deepen(state, moves, guess, 1 + helper % 2, max_depth, time.time())
+
+    after = mm.counts()
+    counts = tuple(b - a for a, b in zip(before[:6], after[:6]))
+    counts += ([b - a for a, b in zip(before[6], after[6])], [b - a for a, b in zip(before[7], after[7])])
+
+    return mm.depthReached, result, counts
+
+
+"""
+Young Brothers Wait workers. Each worker process keeps a Minmax with the settings of the searching one, and the stop flag and best value
+of the current split point in shared memory
+"""
+
+ybwc_worker = None
+ybwc_bound = None
+
+def init_ybwc_worker(settings, stop, bound):
+
+    global ybwc_worker, ybwc_bound
+
+    ybwc_worker = Minmax(**settings)
+    ybwc_worker.stop = stop
+    ybwc_bound = bound
+
+    # The stop flag is only checked with a budget, so an unlimited one is given
+    ybwc_worker.node_limit = float("inf")
+
+def search_brother(state, move, alpha, beta, depth, maximizing):
+
+    """
+    Search a younger brother in a worker (maximizing is True if its parent is max's turn). Returns its value (None if it was aborted), True
+    if it improves the window it was searched with (otherwise the value is only a bound) and the counters of the search
+    """
+
+    mm = ybwc_worker
+    before = mm.counts()
+    value = None
+    improves = False
+
+    if not mm.stop.value:
+
+        # Start the window just past the best value of the split point, so a brother that ties with it gets an exact value
+        if maximizing and ybwc_bound.value > alpha:
+            alpha = math.nextafter(ybwc_bound.value, -math.inf)
+        elif not maximizing and ybwc_bound.value < beta:
+            beta = math.nextafter(ybwc_bound.value, math.inf)
 
-        random_factor = id(state) // 1000 % 3
+        try:
+            value = mm.child_value(state, move, alpha, beta, depth, not maximizing)
+            improves = value > alpha if maximizing else value < beta
+        except SearchAborted:
+            value = None
 
-        return dist_sum/3.0 + (pieces_count - enemypieces_count)*2.4 + center/3.5 + random_factor
+    after = mm.counts()
+    counts = tuple(b - a for a, b in zip(before[:6], after[:6]))
+    counts += ([b - a for a, b in zip(before[6], after[6])], [b - a for a, b in zip(before[7], after[7])])
 
+    return value, improves, counts
@@ -6,31 +6,37 @@ import argparse
 
 """
 
-def normalize_input_matrix(types,depth,heur,cuts, ords):
+def normalize_input_matrix(types,heur,cuts, ords):
 
     """
     Change the format of the matrices in games where there exists only one computer (e.g. [False] to [None, False])
     """
-    newDepth = []
     newHeur = []
     newCuts = []
     newOrds = []
 
     for tp in types:
 
-        if tp == 'C':
-            newDepth.append(depth[0])
+        if tp in ('C', 'M'):
             newHeur.append(heur[0])
             newCuts.append(cuts[0])
             newOrds.append(ords[0])
         else:
-            newDepth.append(None)
             newHeur.append(None)
             newCuts.append(None)
             newOrds.append(None)
 
 
-    return newDepth,newHeur,newCuts,newOrds
+    return newHeur,newCuts,newOrds
+
+def normalize_depths(types, depth):
+
+    """
+    Give each player its depth limit, in the order of the players (only minimax computers have one, e.g. [4] to [None, 4] for P C or M C)
+    """
+    depths = iter(depth)
+
+    return [next(depths) if tp == 'C' else None for tp in types]
 
 def str2bool(v):
     if isinstance(v, bool):
@@ -44,15 +50,42 @@ def str2bool(v):
 
 def parse_arguments(parser):
 
-    parser.add_argument('--mode', choices=['P','C'],required=True, nargs= 2, help="Mode of player 1 and player 2 ('P' for human, 'C' for computer)")
+    parser.add_argument('--mode', choices=['P','C','M'],required=True, nargs= 2, help="Mode of player 1 and player 2 ('P' for human, 'C' for computer with minimax, 'M' for computer with Monte Carlo Tree Search)")
     parser.add_argument('--heur', type=int, choices=range(1,5), nargs = '+', help="Name(s) of the heuristic functions to be used in each player (only needed if (one or more) of the players is AI player)", default=[None,None])
-    parser.add_argument('--depth', type=int, choices=range(1,10), nargs = '+', help="Depth(s), of search (only needed if (one or more) of the players is AI player)", default=[None,None])
+    parser.add_argument('--depth', type=int, choices=range(1,10), nargs = '+', help="Depth(s), of search (only needed if (one or more) of the players is a minimax computer)", default=[])
     parser.add_argument('--cuts',type=str2bool, nargs = '+', help="True or False choice if the computers should use cuts", default=[True,True])
     parser.add_argument('--ord',type=str2bool, nargs = '+', help="True or False choice if the computers should use state choice ordering", default=[True,True])
+    parser.add_argument('--ordering', choices=['eval','dynamic'], help="State ordering used by the computers with --ord True ('eval' sorts the successors by their evaluation, 'dynamic', experimental, by the evaluation of the successors far from the leaves and by killer moves, history and counter-moves close to them)", default='eval')
+    parser.add_argument('--make-unmake',type=str2bool, help="True if the computers should search over a single state, applying and reverting moves in place", default=False)
+    parser.add_argument('--streaming',type=str2bool, help="True if the computers should generate the successors one at a time (the ones after a cut are never generated)", default=True)
+    parser.add_argument('--board', choices=['matrix','bitboard'], help="Board representation ('matrix' for the 8x8 list, 'bitboard' for the 64-bit integer backend)", default='matrix')
+    parser.add_argument('--add-ordering',type=str2bool, help="True if the computers should try first the piece additions with the best static score", default=True)
+    parser.add_argument('--add-pruning', choices=['none','mirror','back_row','all'], help="Piece additions skipped by the computers ('mirror' for mirror images on symmetric boards, 'back_row' for back-row pieces with an empty tile in front, a lossy heuristic that may skip the best addition)", default='none')
+    parser.add_argument('--tt-size',type=float, help="Memory budget (in MB) of the transposition table of the computers (0 disables it)", default=0)
+    parser.add_argument('--time-ms',type=int, help="Time budget (in ms) of each computer move. The search is iterative deepening up to the chosen depth", default=None)
+    parser.add_argument('--engine', choices=['minmax','pvs'], help="Search of the computers ('minmax' for max/min alpha-beta, 'pvs' for the principal variation search)", default='minmax')
+    parser.add_argument('--aspiration',type=float, help="Half-width of the aspiration window of the computers around the value of their previous move or iteration (0 disables it)", default=0)
+    parser.add_argument('--aspiration-growth',type=float, help="Factor the aspiration window is widened by on each fail-low or fail-high", default=2)
+    parser.add_argument('--quiescence',type=str2bool, help="True if the computers should keep searching the leaves with a pending capture until they are quiet", default=False)
+    parser.add_argument('--q-nodes',type=int, help="Maximum nodes of the quiescence search of each leaf", default=200)
+    parser.add_argument('--null-move',type=str2bool, help="True if the computers should use null-move pruning", default=False)
+    parser.add_argument('--verify-null',type=str2bool, help="True if the null-move cuts should be confirmed by a reduced search of the node", default=True)
+    parser.add_argument('--lmr',type=str2bool, help="True if the computers should search late moves with a reduced depth first (late-move reductions)", default=False)
+    parser.add_argument('--futility',type=str2bool, help="True if the computers should use futility pruning at depths 1-2", default=False)
+    parser.add_argument('--razoring',type=str2bool, help="True if the computers should use razoring at depths 2-3", default=False)
+    parser.add_argument('--workers',type=int, help="Number of processes of the parallel search of the computers", default=1)
+    parser.add_argument('--parallel', choices=['root','smp','ybwc'], help="Parallel search of the computers with --workers > 1 ('root' splits the root moves, 'smp' is Lazy SMP, 'ybwc' is Young Brothers Wait)", default='root')
+    parser.add_argument('--persistent',type=str2bool, help="True if each computer should keep its search engine (tables and move ordering) for all its moves", default=False)
+    parser.add_argument('--ponder',type=str2bool, help="True if the computers should search on the opponent's time", default=False)
+    parser.add_argument('--exploration',type=float, help="Exploration constant of the UCT formula of the MCTS computers", default=1.41)
+    parser.add_argument('--playout', choices=['random','heuristic'], help="Playouts of the MCTS computers (random moves, or the best move for their heuristic)", default='random')
+    parser.add_argument('--iterations',type=int, help="Iterations of each MCTS computer move (1000 if neither this nor --time-ms is given)", default=None)
+    parser.add_argument('--nodes',type=int, help="Node budget of each computer move. The search is iterative deepening up to the chosen depth", default=None)
 
     args = parser.parse_args()
 
-    computerCount = args.mode.count('C')
+    computerCount = args.mode.count('C') + args.mode.count('M')
+    minimaxCount = args.mode.count('C')
     depthCount = len(args.depth)
     heurCount = len(args.heur)
     if computerCount != 0:
@@ -66,23 +99,35 @@ def parse_arguments(parser):
             sys.exit(-1)
         else:
 
-            if depthCount > computerCount:
+            if depthCount > minimaxCount:
                 parser.print_help()
                 print('You chose too many depth limits...')
                 sys.exit(-1)
-            elif depthCount < computerCount:
+            elif depthCount < minimaxCount:
                 parser.print_help()
-                print('You need to choose one depth limit for each AI player...')
+                print('You need to choose one depth limit for each minimax player...')
                 sys.exit(-1)
 
     mode = args.mode
     heur = args.heur
-    depth = args.depth
+    depth = normalize_depths(mode, args.depth)
     cuts = args.cuts
     ords = args.ord
 
     if computerCount == 1:
-        depth,heur,cuts,ords = normalize_input_matrix(mode,depth,heur,cuts,ords)
-
-    return mode, heur, depth, cuts, ords
+        heur,cuts,ords = normalize_input_matrix(mode,heur,cuts,ords)
+
+    # Extra keyword arguments of the Game constructor
+    options = {'board': args.board, 'make_unmake': args.make_unmake, 'streaming': args.streaming,
+               'add_ordering': args.add_ordering, 'add_pruning': args.add_pruning, 'tt_size': args.tt_size,
+               'time_ms': args.time_ms, 'nodes': args.nodes, 'engine': args.engine,
+               'ordering': args.ordering, 'aspiration': args.aspiration, 'aspiration_growth': args.aspiration_growth,
+               'quiescence': args.quiescence, 'q_nodes': args.q_nodes,
+               'null_move': args.null_move, 'verify_null': args.verify_null, 'lmr': args.lmr,
+               'futility': args.futility, 'razoring': args.razoring, 'workers': args.workers,
+               'parallel': args.parallel, 'ponder': args.ponder,
+               'persistent': args.persistent, 'exploration': args.exploration, 'playout': args.playout,
+               'iterations': args.iterations}
+
+    return mode, heur, depth, cuts, ords, options
 
@@ -0,0 +1,406 @@
+import sys
+
+from zobrist import ZOBRIST, PIECE_KEYS
+
+'''
+
+BitBoard class
+
+. Board backend that stores the position as two 64-bit integers, one per player. The tile (column, row) is bit (row - 1) * 8 + (column - 1),
+so row 1 is the low byte and row 8 is the high byte of each integer.
+. It exposes the same interface as board.Board, so it can be used anywhere a Board is expected.
+. On top of that it supplies whole-board move generation: ordinary moves, jumps, captures and add-piece tiles are computed for all the pieces
+of a player at once with shifts and masks.
+
+'''
+
+FULL = (1 << 64) - 1
+COLUMN_1 = 0x0101010101010101
+COLUMN_8 = COLUMN_1 << 7
+NOT_COLUMN_1 = FULL ^ COLUMN_1
+NOT_COLUMN_8 = FULL ^ COLUMN_8
+
+ROW_1 = 0xFF
+ROW_2 = ROW_1 << 8
+ROW_7 = ROW_1 << 48
+ROW_8 = ROW_1 << 56
+
+# Columns 2 to 7 of the two starting rows of each player (tiles where pieces may be added)
+ADD_ZONE = [0, (ROW_7 | ROW_8) & NOT_COLUMN_1 & NOT_COLUMN_8, (ROW_1 | ROW_2) & NOT_COLUMN_1 & NOT_COLUMN_8]
+
+# Row that removes a piece from the board when reached (opposite side of each player)
+OTHER_SIDE = [0, ROW_1, ROW_8]
+
+# Directions, per player, as (bit index step, mask of the tiles a piece may leave from without wrapping around the board)
+NORTH = [None, (-8, FULL), (8, FULL)]
+NEAST = [None, (-7, NOT_COLUMN_8), (7, NOT_COLUMN_1)]
+NWEST = [None, (-9, NOT_COLUMN_1), (9, NOT_COLUMN_8)]
+EAST = [None, (1, NOT_COLUMN_8), (-1, NOT_COLUMN_1)]
+WEST = [None, (-1, NOT_COLUMN_1), (1, NOT_COLUMN_8)]
+
+# Same order used by Eximo.exec_all_moves
+MOVE_DIRECTIONS = [None] + [[NORTH[p], NWEST[p], NEAST[p]] for p in (1, 2)]
+JUMP_DIRECTIONS = MOVE_DIRECTIONS
+CAPTURE_DIRECTIONS = [None] + [[NORTH[p], NWEST[p], NEAST[p], EAST[p], WEST[p]] for p in (1, 2)]
+
+# (column, row) coordinates of each bit index
+INDEX_COORDS = [(idx % 8 + 1, idx // 8 + 1) for idx in range(64)]
+
+# (column, row) coordinates of the set bits of each byte value, for each row
+ROW_BYTE_COORDS = [[[INDEX_COORDS[row * 8 + col] for col in range(8) if byte >> col & 1] for byte in range(256)] for row in range(8)]
+
+# Each byte with its bits reversed (a row of the board mirrored left to right)
+MIRROR_BYTE = [int('{:08b}'.format(byte)[::-1], 2) for byte in range(256)]
+
+
+def shift(bits, direction):
+    """
+        Move every set bit one tile in the given direction. Bits that would leave the board are dropped
+    """
+    step, mask = direction
+    bits &= mask
+
+    if step > 0:
+        return (bits << step) & FULL
+
+    return bits >> -step
+
+
+def paths(directions):
+    """
+        For every tile, the (intermediate tile, destination tile) bit pairs of the two-tile operations in the given directions that stay on the board
+    """
+    table = []
+
+    for idx in range(64):
+        start = 1 << idx
+        table.append([(shift(start, d), shift(shift(start, d), d)) for d in directions if shift(shift(start, d), d)])
+
+    return table
+
+
+def bit_indexes(bits):
+    """
+        Indexes of the set bits, lowest first
+    """
+    result = []
+
+    while bits:
+        low = bits & -bits
+        result.append(low.bit_length() - 1)
+        bits ^= low
+
+    return result
+
+
+def mask_to_list(mask):
+    """
+        (column, row) coordinates of the set bits, lowest first
+    """
+    result = []
+    row = 0
+
+    while mask:
+        byte = mask & 0xFF
+
+        if byte:
+            result += ROW_BYTE_COORDS[row][byte]
+
+        mask >>= 8
+        row += 1
+
+    return result
+
+
+def index_to_coords(idx):
+    return INDEX_COORDS[idx]
+
+
+def coords_to_bit(coords):
+    return 1 << ((coords[1] - 1) * 8 + coords[0] - 1)
+
+
+def coords_to_mask(coords_list):
+    mask = 0
+
+    for coords in coords_list:
+        mask |= 1 << ((coords[1] - 1) * 8 + coords[0] - 1)
+
+    return mask
+
+
+def mask_to_coords(mask):
+    return {INDEX_COORDS[idx] for idx in bit_indexes(mask)}
+
+
+def mirror(bits):
+    """
+        Mirror the tiles left to right (column c goes to column 9 - c)
+    """
+    result = 0
+
+    for row in range(8):
+        result |= MIRROR_BYTE[(bits >> (row * 8)) & 0xFF] << (row * 8)
+
+    return result
+
+
+JUMP_PATHS = [None] + [paths(JUMP_DIRECTIONS[p]) for p in (1, 2)]
+CAPTURE_PATHS = [None] + [paths(CAPTURE_DIRECTIONS[p]) for p in (1, 2)]
+
+
+class BitBoard():
+
+    columns = 8
+    rows = 8
+    size = columns * rows
+    nplayers = 2
+
+    __slots__ = ('boards', 'key')
+
+    def __init__(self, boards=None, key=None):
+        # Indexed by player number, position 0 is unused
+        self.boards = self.new_game_boards() if boards is None else boards
+
+        # Zobrist key of the pieces, kept up to date by set_element/remove_element
+        self.key = ZOBRIST.board_key(self.boards) if key is None else key
+
+    def new_game_boards(self):
+        """
+            Initializes the game
+        """
+        return [0, 0x7E7E660000000000, 0x0000000000667E7E]
+
+    def get_element(self, column, row):
+        """
+            Gets piece at row, column. Row and Column from 1 to 8
+            Returns 0 if empty, player_number otherwise
+        """
+        bit = 1 << ((row - 1) * 8 + column - 1)
+
+        if self.boards[1] & bit:
+            return 1
+        elif self.boards[2] & bit:
+            return 2
+        else:
+            return 0
+
+    def set_element(self, column, row, player):
+        """
+            Sets player piece at row, column. Row and Column from 1 to 8
+            Player is from 1 to N
+        """
+        idx = (row - 1) * 8 + column - 1
+        bit = 1 << idx
+        self.remove_bit(idx, bit)
+        self.boards[player] |= bit
+        self.key ^= PIECE_KEYS[player][idx]
+
+    def remove_element(self, column, row):
+        """
+            Remove piece from position row, column
+            (Sets cell to 0)
+        """
+        idx = (row - 1) * 8 + column - 1
+        self.remove_bit(idx, 1 << idx)
+
+    def remove_bit(self, idx, bit):
+        for player in (1, 2):
+            if self.boards[player] & bit:
+                self.boards[player] ^= bit
+                self.key ^= PIECE_KEYS[player][idx]
+
+    def test_row_empty(self, row):
+        """
+            Test if there is empty spaces in a row
+        """
+        row_bits = ROW_1 << ((row - 1) * 8)
+
+        return (self.boards[1] | self.boards[2]) & row_bits != row_bits
+
+    def pieces(self, player):
+        """
+            Player must be either 1 or 2
+            Returns where all the pieces off the player are in a list with column, row tuples
+        """
+        return mask_to_list(self.boards[player])
+
+    def count(self, player):
+        """
+            Number of pieces of the player
+        """
+        return bin(self.boards[player]).count('1')
+
+    def empty(self):
+        """
+            Bitmask of the empty tiles
+        """
+        return FULL ^ (self.boards[1] | self.boards[2])
+
+    def move_targets(self, player, direction):
+        """
+            Tiles reachable by an ordinary move of any of the player's pieces in the given direction
+        """
+        return shift(self.boards[player], direction) & self.empty()
+
+    def jump_targets(self, player, direction, sources=None):
+        """
+            Tiles reachable by a jump over a friendly piece in the given direction.
+            sources restricts the pieces that may jump (all of the player's pieces by default)
+        """
+        own = self.boards[player]
+        start = own if sources is None else own & sources
+
+        return shift(shift(start, direction) & own, direction) & self.empty()
+
+    def capture_targets(self, player, direction, sources=None):
+        """
+            Tiles reachable by a capture of an enemy piece in the given direction.
+            sources restricts the pieces that may capture (all of the player's pieces by default)
+        """
+        own = self.boards[player]
+        start = own if sources is None else own & sources
+
+        return shift(shift(start, direction) & self.boards[3 - player], direction) & self.empty()
+
+    def capture_sources(self, player, sources=None):
+        """
+            Bitmask of the pieces of the player that can execute a capture
+        """
+        result = 0
+
+        for step, mask in CAPTURE_DIRECTIONS[player]:
+            targets = self.capture_targets(player, (step, mask), sources)
+            result |= shift(targets, (-2 * step, FULL))
+
+        return result
+
+    def jump_sources(self, player, sources=None):
+        """
+            Bitmask of the pieces of the player that can execute a jump
+        """
+        result = 0
+
+        for step, mask in JUMP_DIRECTIONS[player]:
+            targets = self.jump_targets(player, (step, mask), sources)
+            result |= shift(targets, (-2 * step, FULL))
+
+        return result
+
+    def can_jump_from(self, player, idx):
+        """
+            Check if the piece on bit index idx can execute a jump
+        """
+        own = self.boards[player]
+        occupied = own | self.boards[3 - player]
+
+        for mid, land in JUMP_PATHS[player][idx]:
+            if own & mid and not occupied & land:
+                return True
+
+        return False
+
+    def can_capture_from(self, player, idx):
+        """
+            Check if the piece on bit index idx can execute a capture
+        """
+        enemy = self.boards[3 - player]
+        occupied = enemy | self.boards[player]
+
+        for mid, land in CAPTURE_PATHS[player][idx]:
+            if enemy & mid and not occupied & land:
+                return True
+
+        return False
+
+    def addition_tiles(self, player):
+        """
+            Bitmask of the empty tiles where the player may add a piece
+        """
+        return ADD_ZONE[player] & self.empty()
+
+    def print(self):
+        for i in range(1, self.nplayers + 1):
+            print(bin(self.boards[i]))
+
+    def print_board(self, f=sys.stdout):
+
+        print("   1 2 3 4 5 6 7 8  ", file=f)
+        print(" -------------------", file=f)
+        for i in range(1, 9):
+
+            row = str(i) + "| "
+            for j in range(1, 9):
+
+                if(self.get_element(j, i) == 1):
+                    row = row + "X"
+                elif(self.get_element(j, i) == 2):
+                    row = row + "O"
+                else:
+                    row = row + "."
+
+                row = row + " "
+
+            row = row + "|"
+
+            print(row, file=f)
+
+        print(" -------------------", file=f)
+
+    def init_from_matrix(self, matrix):
+
+        self.boards = [0, 0, 0]
+        self.key = 0
+
+        for i in range(1, 9):
+
+            for j in range(1, 9):
+
+                if(matrix[i-1][j-1] != 0):
+                    self.set_element(j, i, matrix[i-1][j-1])
+
+    def normalized_pieces(self, player):
+        pieces = self.pieces(player)
+
+        if player == 1:
+            pieces = [(x, 9 - y) for (x, y) in pieces]
+
+        return pieces
+
+    def column_control(self, player):
+
+        result = 0
+        column = COLUMN_1
+
+        for i in range(8):
+
+            own = self.boards[player] & column
+            enemy = self.boards[3 - player] & column
+
+            # The piece closest to row 1 decides who controls the column
+            if own and (not enemy or (own & -own) < (enemy & -enemy)):
+                result += 1
+
+            column <<= 1
+
+        return result
+
+    def get_key(self):
+        """
+            Zobrist key of the position of the pieces
+        """
+        return self.key
+
+    def is_mirror_symmetric(self):
+        """
+            Check if the position is the same when mirrored left to right
+        """
+        return mirror(self.boards[1]) == self.boards[1] and mirror(self.boards[2]) == self.boards[2]
+
+    def copy(self):
+        return BitBoard(self.boards.copy(), self.key)
+
+    @classmethod
+    def from_binary_matrix(cls, bm):
+
+        return cls(boards=bm.boards.copy(), key=bm.key)
@@ -1,14 +1,29 @@
 import sys
 
+from bitboard import mask_to_list
+from zobrist import ZOBRIST, PIECE_KEYS
+
 
 class Board():
-    def __init__(self, boards=None):
-        self.columns = 8
-        self.rows = 8
-        self.size = self.columns * self.rows
-        self.nplayers = 2
+
+    columns = 8
+    rows = 8
+    size = columns * rows
+    nplayers = 2
+
+    __slots__ = ('board', 'piece_masks', 'key')
+
+    def __init__(self, boards=None, piece_masks=None, key=None):
+        # Rows are bytearrays, indexed like lists
         self.board = self.new_game_boards() if boards is None else boards
 
+        # Bitmask of the tiles of each player (indexed by player number), with the bit layout of bitboard.BitBoard. Kept up to date by
+        # set_element/remove_element
+        self.piece_masks = self.scan_pieces() if piece_masks is None else piece_masks
+
+        # Zobrist key of the pieces, kept up to date by set_element/remove_element
+        self.key = ZOBRIST.board_key(self.piece_masks) if key is None else key
+
     def new_game_boards(self):
         """
             Initializes the game
@@ -24,7 +39,20 @@ class Board():
             [0, 1, 1, 1, 1, 1, 1, 0]
         ]
 
-        return board
+        return [bytearray(row) for row in board]
+
+    def scan_pieces(self):
+        """
+            Build the piece bitmasks of both players from the matrix
+        """
+        piece_masks = [0, 0, 0]
+
+        for y, row in enumerate(self.board):
+            for x, piece in enumerate(row):
+                if piece != 0:
+                    piece_masks[piece] |= 1 << (y * 8 + x)
+
+        return piece_masks
 
     def get_element(self, column, row):
         """
@@ -38,14 +66,29 @@ class Board():
             Sets player piece at row, column. Row and Column from 1 to 8
             Player is from 1 to N
         """
+        old = self.board[row - 1][column - 1]
+        idx = (row - 1) * 8 + column - 1
+
+        if old != 0:
+            self.piece_masks[old] &= ~(1 << idx)
+            self.key ^= PIECE_KEYS[old][idx]
+
         self.board[row - 1][column - 1] = player
+        self.piece_masks[player] |= 1 << idx
+        self.key ^= PIECE_KEYS[player][idx]
 
     def remove_element(self, column, row):
         """
             Remove piece from position row, column
             (Sets cell to 0)
         """
-        self.board[row - 1][column - 1] = 0
+        old = self.board[row - 1][column - 1]
+
+        if old != 0:
+            idx = (row - 1) * 8 + column - 1
+            self.piece_masks[old] &= ~(1 << idx)
+            self.key ^= PIECE_KEYS[old][idx]
+            self.board[row - 1][column - 1] = 0
 
     def test_row_empty(self, row):
         """
@@ -63,7 +106,14 @@ class Board():
             Returns where all the pieces off the player are in a list with column, row tuples
         """
 
-        return [(x + 1, y + 1) for y, row in enumerate(self.board) for x, piece in enumerate(row) if piece == player]
+        return mask_to_list(self.piece_masks[player])
+
+    def count(self, player):
+        """
+            Number of pieces of the player
+        """
+
+        return bin(self.piece_masks[player]).count('1')
 
     def print(self):
         for i in range(self.nplayers):
@@ -133,9 +183,24 @@ class Board():
 
         return sum(result)
 
+    def get_key(self):
+        """
+            Zobrist key of the position of the pieces
+        """
+        return self.key
+
+    def is_mirror_symmetric(self):
+        """
+            Check if the position is the same when mirrored left to right
+        """
+        return all(row == row[::-1] for row in self.board)
+
+    def copy(self):
+        return Board.from_binary_matrix(self)
+
     @classmethod
     def from_binary_matrix(cls, bm):
 
         new_board = [row.copy() for row in bm.board]
 
-        return cls(boards=new_board)
+        return cls(boards=new_board, piece_masks=bm.piece_masks.copy(), key=bm.key)
@@ -0,0 +1,70 @@
+'''
+
+Evaluation functions
+
+. Heuristics of the computer players, shared by the search engines (Minmax and the heuristic playouts of MCTS). Each function returns a
+numeric value of the given state (higher values signify a good gamestate) from the perspective of the player given as an argument.
+. EVALS holds them in the order of the --heur command-line option (heuristic n is EVALS[n - 1]).
+
+'''
+
+
+def eval1(state, player_perspective):
+    enemy = state.get_enemy(player_perspective)
+
+    # Pieces are read from the board's piece sets (no 64 tile scan)
+    pieces = state.board.normalized_pieces(player_perspective)
+    pieces_count = len(pieces)
+    enemypieces_count = state.board.count(enemy)
+    dist_sum = sum([y for (_, y) in pieces])
+
+    random_factor = state.get_key() % 3
+
+    return dist_sum + (pieces_count - enemypieces_count) + random_factor #+ self.board.column_control(player_perspective)
+
+def eval2(state, player_perspective):
+    enemy = state.get_enemy(player_perspective)
+
+    pieces = state.board.normalized_pieces(player_perspective)
+    pieces_count = len(pieces)
+    enemypieces_count = state.board.count(enemy)
+    dist_sum = sum([y for (_, y) in pieces])
+    out_columns_player = len([x for (x, _) in pieces if x == 1 or x == 8])
+
+    random_factor = state.get_key() % 3
+
+    return dist_sum/3.0 + (pieces_count - enemypieces_count)*3.0 + (out_columns_player)*2 + random_factor
+
+def eval3(state, player_perspective):
+    enemy = state.get_enemy(player_perspective)
+
+    pieces = state.board.normalized_pieces(player_perspective)
+    enemypieces = state.board.pieces(enemy)
+    pieces_count = len(pieces)
+    enemypieces_count = len(enemypieces)
+    dist_sum = sum([y for (_, y) in pieces])
+    out_columns_player = len([x for (x, _) in pieces if x == 1 or x == 8])
+    out_columns_enemy = len([x for (x, _) in enemypieces if x == 1 or x == 8])
+
+    random_factor = state.get_key() % 3
+
+    return dist_sum/3.0 + (pieces_count - enemypieces_count)*3.0 + (out_columns_player- out_columns_enemy)*2.3 + random_factor
+
+# Center value of a piece by column
+CENTER_WEIGHTS = [None, 9, 1, 2, 4.5, 4.5, 2, 1, 9]
+
+def eval4(state, player_perspective):
+    enemy = state.get_enemy(player_perspective)
+
+    pieces_count = 0
+    enemypieces_count = 0
+
+    pieces = state.board.normalized_pieces(player_perspective)
+    dist_sum = sum([y for (_, y) in pieces])
+    center = sum([CENTER_WEIGHTS[x] for (x, _) in pieces])
+
+    random_factor = state.get_key() % 3
+
+    return dist_sum/3.0 + (pieces_count - enemypieces_count)*2.4 + center/3.5 + random_factor
+
+EVALS = [eval1, eval2, eval3, eval4]
@@ -9,9 +9,9 @@ def main():
 
     # Parse arguments
     parser = argparse.ArgumentParser(description='Play Eximo.')
-    mode, heuristics, depth, cuts, ords = parse_arguments(parser)
+    mode, heuristics, depth, cuts, ords, options = parse_arguments(parser)
 
-    game = Game(mode[0],mode[1], depth, heuristics,cuts, ords)
+    game = Game(mode[0],mode[1], depth, heuristics,cuts, ords, **options)
     game.run()
 
 
@@ -0,0 +1,168 @@
+import argparse
+import sys
+import time
+from multiprocessing import Pool
+
+from Eximo import *
+
+"""
+    Perft (performance test) of the Eximo move generator. Counts the leaf nodes of the tree of exec_all_moves outcomes up to a given depth
+    (states without successors are leaves as well), so any board backend or Eximo implementation can be checked for exact equality and
+    measured for speed.
+
+    Position files have one line per board row (row 1 first) with 8 tiles each: X for player 1, O for player 2 and . for empty tiles
+    (the same symbols used by print_board; spaces and '|' are ignored). An optional line with 1 or 2 sets the player to move (1 by default).
+    Empty lines and lines starting with # are skipped.
+"""
+
+#python3 perft.py 4 --divide --jobs 4 --board all
+
+TILE_VALUES = {'.': 0, 'X': 1, 'O': 2}
+
+def read_position(path, board='matrix'):
+
+    """
+    Build the state described by a position file (see the module description)
+    """
+
+    matrix = []
+    player = 1
+
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+
+            if len(line) == 0 or line.startswith('#'):
+                continue
+
+            if line in ('1', '2'):
+                player = int(line)
+                continue
+
+            tiles = [tile for tile in line if tile in TILE_VALUES]
+
+            if len(tiles) != 8:
+                raise ValueError("Invalid board row: " + line)
+
+            matrix.append([TILE_VALUES[tile] for tile in tiles])
+
+    if len(matrix) != 8:
+        raise ValueError("A position must have 8 board rows")
+
+    new_board = BOARD_BACKENDS[board]()
+    new_board.init_from_matrix(matrix)
+
+    state = Eximo(player, Eximo.FREE, set(), new_board)
+    state.perform_full_checkup()
+
+    return state
+
+def initial_position(board='matrix'):
+
+    state = Eximo(board=BOARD_BACKENDS[board]())
+    state.perform_full_checkup()
+
+    return state
+
+def perft(state, depth):
+
+    """
+    Number of leaf nodes of the exec_all_moves tree rooted at state, up to the given depth
+    """
+
+    if depth == 0:
+        return 1
+
+    outcomes = state.exec_all_moves(1)
+
+    if len(outcomes) == 0:
+        return 1
+
+    # Leaves are counted without being expanded
+    if depth == 1:
+        return len(outcomes)
+
+    return sum(perft(outcome, depth - 1) for outcome in outcomes)
+
+def move_name(move):
+
+    """
+    Readable form of a compact move: the path of the moved piece followed by the added pieces, if any
+    """
+
+    return "-".join("{}{}".format(*unpack_tile(tile)) for tile in move)
+
+def divide_task(state, move, depth):
+    return perft(state.apply(move), depth - 1)
+
+def divide(state, depth, jobs=1):
+
+    """
+    Perft of each root move, as a list of (move, leaf nodes) pairs. Root moves are split among jobs processes if jobs > 1
+    """
+
+    moves = state.generate_moves()
+    tasks = [(state, move, depth) for move in moves]
+
+    if jobs > 1:
+        with Pool(jobs) as pool:
+            counts = pool.starmap(divide_task, tasks)
+    else:
+        counts = [divide_task(*task) for task in tasks]
+
+    return list(zip(moves, counts))
+
+def run(state, depth, show_divide, jobs, f=sys.stdout):
+
+    """
+    Run perft on the state, print the results and return the number of leaf nodes
+    """
+
+    start = time.time()
+
+    if depth == 0:
+        nodes = 1
+    elif show_divide or jobs > 1:
+        results = divide(state, depth, jobs)
+        nodes = sum(count for move, count in results) if results else 1
+
+        if show_divide:
+            for move, count in results:
+                print("{}: {}".format(move_name(move), count), file=f)
+    else:
+        nodes = perft(state, depth)
+
+    elapsed = time.time() - start
+
+    print("Nodes: {}".format(nodes), file=f)
+    print("Time: {:.3f}s ({:.0f} nodes/sec)".format(elapsed, nodes / elapsed if elapsed > 0 else 0), file=f)
+
+    return nodes
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Count the leaf nodes of the Eximo move generator.')
+    parser.add_argument('depth', type=int, help="Depth of the count (in turns)")
+    parser.add_argument('--position', help="Position file (initial position by default)")
+    parser.add_argument('--divide', action='store_true', help="Show the count of each root move")
+    parser.add_argument('--jobs', type=int, default=1, help="Number of processes the root moves are split among")
+    parser.add_argument('--board', choices=['matrix', 'bitboard', 'all'], default='matrix', help="Board representation ('all' runs every backend and checks the counts are equal)")
+
+    args = parser.parse_args()
+
+    boards = list(BOARD_BACKENDS) if args.board == 'all' else [args.board]
+    counts = []
+
+    for board in boards:
+        state = read_position(args.position, board) if args.position else initial_position(board)
+
+        print("-- {} (depth = {})".format(board, args.depth))
+        counts.append(run(state, args.depth, args.divide, args.jobs))
+
+    if len(set(counts)) > 1:
+        print("Backends disagree: " + ", ".join("{} {}".format(board, count) for board, count in zip(boards, counts)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
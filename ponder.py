@@ -0,0 +1,151 @@
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from Minmax import Minmax, SearchAborted
+from transposition_table import SharedTranspositionTable
+
+'''
+
+Ponder class
+
+. Searches on the opponent's time. After the computer moves, a background process searches the positions the opponent's replies lead to,
+as the computer will search them on its next turn, storing the results in a transposition table in shared memory. The search of the next
+turn uses that table, so the positions already searched while pondering (all of them if the opponent played the predicted reply and the
+pondering got to the full depth) are cut by the table instead of searched again.
+. The predicted reply (the best move of the opponent found by the computer's own search) is searched first, to the full depth with
+iterative deepening. Then every reply is searched with iterative deepening, all of them at each depth before going to the next one.
+. The pondering is stopped through a shared flag as soon as the opponent moves.
+
+'''
+
+class Ponder():
+
+    def __init__(self, settings, tt_size=16):
+
+        self.table = SharedTranspositionTable(tt_size)
+        self.stop = multiprocessing.RawValue('b', 0)
+        self.pool = ProcessPoolExecutor(1, initializer=init_ponder_worker, initargs=(settings, self.table, self.stop))
+        self.future = None
+        self.predicted = None
+
+        # Statistics
+        self.nodeCount = 0
+        self.hitCount = 0           # Turns where the opponent played the predicted reply
+        self.ponderCount = 0
+        self.depthReached = 0       # Depth searched for the predicted reply in the last pondering
+
+    def start(self, state):
+
+        """
+        Start pondering the state (the opponent's turn, after the computer's move). The table must hold the computer's search of the move
+        """
+
+        entry = self.table.lookup(state.get_key())
+        self.predicted = entry[4] if entry is not None else None
+
+        self.stop.value = 0
+        self.future = self.pool.submit(ponder_search, state.copy(), self.predicted)
+        self.ponderCount += 1
+
+    def finish(self, state=None):
+
+        """
+        Stop pondering, once the opponent moved to the given state
+        """
+
+        if self.future is None:
+            return
+
+        self.stop.value = 1
+        predicted_key, self.depthReached, nodes = self.future.result()
+        self.future = None
+
+        # Update statistics
+        self.nodeCount += nodes
+        if state is not None and predicted_key == (state.board.key, state.curr_player):
+            self.hitCount += 1
+
+    def close(self):
+
+        self.finish()
+        self.pool.shutdown()
+        self.table.release()
+
+    def print_stats(self, f=sys.stdout):
+
+        print("Ponder nodes: " + str(self.nodeCount) + " (" + str(self.ponderCount) + " turns, " + str(self.hitCount) + " predicted replies played)", file=f)
+
+
+"""
+Ponder worker. The worker process keeps a Minmax with the settings of the computer, attached to the shared transposition table and stop
+flag
+"""
+
+ponder_worker = None
+
+def init_ponder_worker(settings, table, stop):
+
+    global ponder_worker
+
+    ponder_worker = Minmax(**settings)
+    ponder_worker.tt = table
+    ponder_worker.stop = stop
+
+    # The stop flag is only checked with a budget, so an unlimited one is given
+    ponder_worker.node_limit = float("inf")
+
+def ponder_search(state, predicted):
+
+    """
+    Search the positions of the opponent's replies until stopped. Returns the board key and player to move of the position of the predicted
+    reply (None if there is none), the depth it was searched to and the nodes searched
+    """
+
+    mm = ponder_worker
+    max_depth = mm.depth
+    nodes = mm.expansionCount + mm.leafCount
+
+    replies = state.generate_moves(mm.chain_cache)
+    if predicted is not None and predicted in replies:
+        replies.remove(predicted)
+        replies.insert(0, predicted)
+    else:
+        predicted = None
+
+    positions = [state.apply(reply) for reply in replies]
+    predicted_key = (positions[0].board.key, positions[0].curr_player) if predicted is not None else None
+    depth_reached = 0
+
+    try:
+        # Predicted reply first, then all of them
+        if predicted is not None:
+            for depth in range(1, max_depth + 1):
+                ponder_position(mm, positions[0], depth)
+                depth_reached = depth
+
+        for depth in range(1, max_depth + 1):
+            for position in positions:
+                ponder_position(mm, position, depth)
+    except SearchAborted:
+        pass
+
+    mm.depth = max_depth
+
+    return predicted_key, depth_reached, mm.expansionCount + mm.leafCount - nodes
+
+def ponder_position(mm, position, depth):
+
+    """
+    Search a position (the computer's turn) to the given depth, as the computer's own search would
+    """
+
+    if mm.stop.value:
+        raise SearchAborted()
+
+    position = position.copy()
+    moves = position.generate_moves(mm.chain_cache)
+
+    if len(moves) > 0:
+        mm.depth = depth
+        mm.root_value(position, moves, depth)
@@ -0,0 +1,412 @@
+import argparse
+import time
+
+import numpy as np
+
+from bitboard import *
+from Eximo import *
+
+'''
+
+Simulator class
+
+. Plays N Eximo games at once. The boards are kept in a (N, 2) uint64 array (one bitboard per player, with the same bit layout as BitBoard)
+together with the player, gamestate flag and pending piece of each game, so every step is a handful of NumPy operations over all the games.
+. Each step applies one operation (ordinary-move, jump, capture or the addition of the pieces) to every unfinished game. The legal operations
+of all the games are computed at once as target masks, one per (game, operation kind), and the rules of Eximo are applied on top of them:
+mandatory captures, successive jumps/captures by the same piece and piece addition when a piece reaches the opposite side.
+. A game ends when the player to move has no operations (the enemy wins) or after max_turns turns (draw).
+. Operations are chosen at random or greedily (the one whose piece lands furthest ahead, ties broken at random).
+. verify replays games on the scalar rules engine (Eximo with a BitBoard) and checks that both agree on every step.
+
+'''
+
+U64 = np.uint64
+
+# Columns of the legal-move matrix: 3 ordinary-moves, 3 jumps and 5 captures, in the order used by Eximo.exec_all_moves
+MOVE, JUMP, CAPTURE = 0, 1, 2
+KINDS = [MOVE] * 3 + [JUMP] * 3 + [CAPTURE] * 5
+DISTANCES = np.array([1] * 3 + [2] * 8, dtype=np.int64)
+OPERATIONS = [None] + [MOVE_DIRECTIONS[p] + JUMP_DIRECTIONS[p] + CAPTURE_DIRECTIONS[p] for p in (1, 2)]
+STEPS = [None] + [np.array([step for step, mask in OPERATIONS[p]], dtype=np.int64) for p in (1, 2)]
+COLUMNS = len(KINDS)
+
+# Rows a piece has advanced when it lands on each tile (used by the greedy policy)
+ADVANCE = [None] + [np.array([8 - INDEX_COORDS[idx][1] if p == 1 else INDEX_COORDS[idx][1] - 1 for idx in range(64)] * COLUMNS, dtype=np.float64) for p in (1, 2)]
+
+# Score of adding a piece to each tile (same as Eximo.add_piece_score)
+ADD_SCORES = [None] + [np.array([(10 if INDEX_COORDS[idx][1] == (7 if p == 1 else 2) else 0) - abs(2 * INDEX_COORDS[idx][0] - 9) for idx in range(64)], dtype=np.float64) for p in (1, 2)]
+
+
+def shift_bits(bits, direction):
+    """
+        Vectorized bitboard.shift
+    """
+    step, mask = direction
+    bits = bits & U64(mask)
+
+    if step > 0:
+        return bits << U64(step)
+
+    return bits >> U64(-step)
+
+
+def unpack(masks):
+    """
+        Bits of a (N,) or (N, K) array of uint64 masks, as a (N, 64 * K) boolean array (bit i of mask j is column j * 64 + i)
+    """
+    masks = np.ascontiguousarray(masks, dtype='<u8').reshape(len(masks), -1)
+
+    return np.unpackbits(masks.view(np.uint8), axis=-1, bitorder='little').astype(bool)
+
+
+def bit(indexes):
+    return np.left_shift(U64(1), indexes.astype(np.uint64))
+
+
+class Simulator:
+
+    def __init__(self, n, policy='random', seed=None, max_turns=500, trace=()):
+
+        self.n = n
+        self.policy = policy
+        self.max_turns = max_turns
+        self.rng = np.random.default_rng(seed)
+
+        initial = BitBoard().boards
+        self.boards = np.tile(np.array([initial[1], initial[2]], dtype=np.uint64), (n, 1))
+        self.player = np.ones(n, dtype=np.int8)
+        self.flag = np.full(n, Eximo.FREE, dtype=np.int8)
+        self.pending = np.zeros(n, dtype=np.uint64)     # Piece that must keep jumping/capturing
+        self.turns = np.zeros(n, dtype=np.int32)
+        self.done = np.zeros(n, dtype=bool)
+        self.winner = np.zeros(n, dtype=np.int8)        # 0 while playing and for draws
+
+        # Steps of the traced games, as (boards, player, flag, pending, legal operations, chosen operation)
+        self.traces = {game: [] for game in trace}
+
+    def run(self):
+
+        """
+        Play all the games to the end
+
+            ret -> array with the winner of each game (0 for draws)
+        """
+
+        while not self.done.all():
+            self.step()
+
+        return self.winner
+
+    def step(self):
+
+        """
+        Apply one operation to every unfinished game
+        """
+
+        groups = []
+
+        for player in (1, 2):
+            games = np.nonzero(~self.done & (self.player == player))[0]
+            groups.append((player, games[self.flag[games] == Eximo.ADDPIECE_2], games[self.flag[games] != Eximo.ADDPIECE_2]))
+
+        for player, adding, playing in groups:
+            if adding.size:
+                self.add_pieces(adding, player)
+            if playing.size:
+                self.play(playing, player)
+
+    def legal_targets(self, games, player):
+
+        """
+        Legal-move masks of the given games (all with the same player to move): a (len(games), 11) array with the destination tiles of the
+        operations of each column (see OPERATIONS)
+        """
+
+        own = self.boards[games, player - 1]
+        enemy = self.boards[games, 2 - player]
+        empty = ~(own | enemy)
+        flag = self.flag[games]
+        sources = np.where(flag == Eximo.FREE, own, self.pending[games])
+
+        targets = np.zeros((len(games), COLUMNS), dtype=np.uint64)
+
+        for column, direction in enumerate(OPERATIONS[player]):
+            if KINDS[column] == MOVE:
+                targets[:, column] = shift_bits(own, direction) & empty
+            elif KINDS[column] == JUMP:
+                targets[:, column] = shift_bits(shift_bits(sources, direction) & own, direction) & empty
+            else:
+                targets[:, column] = shift_bits(shift_bits(sources, direction) & enemy, direction) & empty
+
+        # Captures are mandatory. Chains only allow the operation kind that started them
+        captures = (targets[:, 6:] != 0).any(axis=1)
+        capture_mode = (flag == Eximo.CAPT) | ((flag == Eximo.FREE) & captures)
+        jump_mode = (flag == Eximo.JUMP) | ((flag == Eximo.FREE) & ~captures)
+        move_mode = (flag == Eximo.FREE) & ~captures
+
+        targets[~move_mode, 0:3] = 0
+        targets[~jump_mode, 3:6] = 0
+        targets[~capture_mode, 6:] = 0
+
+        return targets
+
+    def choose(self, legal, scores):
+
+        """
+        Index of the chosen True entry of each row of legal, following the policy (scores are the greedy preferences of each entry)
+        """
+
+        noise = self.rng.random(legal.shape)
+
+        if self.policy == 'greedy':
+            noise = scores + noise
+
+        noise[~legal] = -1
+
+        return noise.argmax(axis=1)
+
+    def play(self, games, player):
+
+        """
+        Apply a move, jump or capture to each of the given games (all with the same player to move, none in an add-piece state)
+        """
+
+        legal = unpack(self.legal_targets(games, player))
+        has_moves = legal.any(axis=1)
+
+        # The player to move has lost when there are no operations left
+        lost = games[~has_moves]
+        self.trace_steps(lost, player, legal[~has_moves], None)
+        self.done[lost] = True
+        self.winner[lost] = 3 - player
+
+        games = games[has_moves]
+        legal = legal[has_moves]
+
+        if games.size == 0:
+            return
+
+        choice = self.choose(legal, ADVANCE[player])
+        self.trace_steps(games, player, legal, choice)
+
+        column = choice // 64
+        land_idx = choice % 64
+        steps = STEPS[player][column]
+        kinds = np.array(KINDS)[column]
+
+        land = bit(land_idx)
+        start = bit(land_idx - DISTANCES[column] * steps)
+        captured = np.where(kinds == CAPTURE, bit(land_idx - steps), U64(0))
+
+        own = self.boards[games, player - 1] ^ land ^ start
+        enemy = self.boards[games, 2 - player] ^ captured
+
+        # Pieces that reach the opposite side are removed and replaced by the added ones
+        reached = (land & U64(OTHER_SIDE[player])) != 0
+        own = np.where(reached, own ^ land, own)
+        empty = ~(own | enemy)
+        can_add = reached & ((empty & U64(ADD_ZONE[player])) != 0)
+
+        # Successive jumps/captures of the same piece
+        chain_jump = np.zeros(len(games), dtype=bool)
+        chain_capture = np.zeros(len(games), dtype=bool)
+
+        for direction in JUMP_DIRECTIONS[player]:
+            chain_jump |= (shift_bits(shift_bits(land, direction) & own, direction) & empty) != 0
+
+        for direction in CAPTURE_DIRECTIONS[player]:
+            chain_capture |= (shift_bits(shift_bits(land, direction) & enemy, direction) & empty) != 0
+
+        chain_jump &= ~reached & (kinds == JUMP)
+        chain_capture &= ~reached & (kinds == CAPTURE)
+
+        self.boards[games, player - 1] = own
+        self.boards[games, 2 - player] = enemy
+        self.pending[games] = np.where(chain_jump | chain_capture, land, U64(0))
+        self.flag[games] = np.select([can_add, chain_jump, chain_capture], [Eximo.ADDPIECE_2, Eximo.JUMP, Eximo.CAPT], Eximo.FREE)
+
+        self.end_turn(games[~(can_add | chain_jump | chain_capture)], player)
+
+    def add_pieces(self, games, player):
+
+        """
+        Add the pieces of the given games (all with the same player to move, in an add-piece state)
+        """
+
+        own = self.boards[games, player - 1]
+        tiles = U64(ADD_ZONE[player]) & ~(own | self.boards[games, 2 - player])
+        free = unpack(tiles)
+
+        # Two pieces are added at once (one if there is a single free tile)
+        first = self.choose(free, ADD_SCORES[player])
+        free[np.arange(len(games)), first] = False
+        has_second = free.any(axis=1)
+        second = self.choose(free, ADD_SCORES[player])
+
+        added = bit(first) | np.where(has_second, bit(second), U64(0))
+
+        if self.traces:
+            legal = unpack(tiles)
+            for row, game in enumerate(games):
+                if game in self.traces:
+                    chosen = (first[row], second[row]) if has_second[row] else (first[row],)
+                    self.traces[game].append(self.snapshot(game) + (legal[row], chosen))
+
+        self.boards[games, player - 1] = own | added
+        self.end_turn(games, player)
+
+    def end_turn(self, games, player):
+
+        self.player[games] = 3 - player
+        self.flag[games] = Eximo.FREE
+        self.pending[games] = 0
+        self.turns[games] += 1
+
+        # Games that are too long end in a draw
+        self.done[games[self.turns[games] >= self.max_turns]] = True
+
+    def snapshot(self, game):
+        return (int(self.boards[game, 0]), int(self.boards[game, 1]), int(self.player[game]), int(self.flag[game]), int(self.pending[game]))
+
+    def trace_steps(self, games, player, legal, choice):
+
+        if not self.traces:
+            return
+
+        for row, game in enumerate(games):
+            if game in self.traces:
+                self.traces[game].append(self.snapshot(game) + (legal[row], None if choice is None else choice[row]))
+
+
+def scalar_state(board1, board2, player, flag, pending):
+
+    """
+    Eximo state (with a BitBoard) that corresponds to a step of the simulator
+    """
+
+    board = BitBoard([0, board1, board2])
+
+    next_pieces = board.addition_tiles(player) if flag == Eximo.ADDPIECE_2 else pending
+
+    return Eximo(player, flag, next_pieces, board)
+
+
+def trace_operations(player, flag, legal):
+
+    """
+    Operations of a traced step, in the format of Eximo.operations (pairs of added tiles as sets)
+    """
+
+    entries = np.nonzero(legal)[0]
+
+    if flag == Eximo.ADDPIECE_2:
+        tiles = [INDEX_COORDS[idx] for idx in entries]
+
+        if len(tiles) == 1:
+            return {frozenset(tiles)}
+
+        return {frozenset((pos1, pos2)) for i, pos1 in enumerate(tiles) for pos2 in tiles[i+1:]}
+
+    return {operation_coords(player, entry) for entry in entries}
+
+
+def operation_coords(player, entry):
+
+    column, land_idx = entry // 64, entry % 64
+    start = land_idx - DISTANCES[column] * STEPS[player][column]
+
+    return (INDEX_COORDS[start], INDEX_COORDS[land_idx])
+
+
+def verify(games=20, policy='random', seed=0, max_turns=500):
+
+    """
+    Play games with the simulator and replay every step of each one on the scalar rules engine. Both must agree on the legal operations of
+    every step, on the state each chosen operation leads to and on the end of the game
+
+        ret -> number of steps checked
+    """
+
+    simulator = Simulator(games, policy, seed, max_turns, trace=range(games))
+    simulator.run()
+    checked = 0
+
+    # The piece additions are compared as sets of tiles, without pruning
+    pruning = Eximo.ADD_PRUNING
+    Eximo.ADD_PRUNING = 'none'
+
+    try:
+        for game, steps in simulator.traces.items():
+            for idx, (board1, board2, player, flag, pending, legal, choice) in enumerate(steps):
+
+                state = scalar_state(board1, board2, player, flag, pending)
+                operations = {frozenset(operation) if flag == Eximo.ADDPIECE_2 else operation for operation in state.operations()}
+
+                if operations != trace_operations(player, flag, legal):
+                    raise AssertionError("Game {}, step {}: legal operations differ".format(game, idx))
+
+                # Game over
+                if choice is None:
+                    if not state.is_game_over():
+                        raise AssertionError("Game {}, step {}: the scalar engine has operations left".format(game, idx))
+                    checked += 1
+                    continue
+
+                if flag == Eximo.ADDPIECE_2:
+                    state.make_move(tuple(INDEX_COORDS[tile] for tile in choice))
+                else:
+                    state.make_move(operation_coords(player, choice))
+
+                if state.next_move == Eximo.ADDPIECE_2 and len(state.next_pieces) == 0:
+                    state.perform_checkup()
+
+                # Compare with the next step of the simulator (the last step of a drawn game has no successor to compare with)
+                if idx + 1 < len(steps):
+                    board1, board2, player, flag, pending = steps[idx + 1][:5]
+                    expected = scalar_state(board1, board2, player, flag, pending)
+
+                    if (state.board.boards[1:], state.curr_player, state.next_move) != (expected.board.boards[1:], expected.curr_player, expected.next_move):
+                        raise AssertionError("Game {}, step {}: resulting states differ".format(game, idx))
+
+                    if state.next_move != Eximo.FREE and set(state.next_pieces) != set(expected.next_pieces):
+                        raise AssertionError("Game {}, step {}: pending pieces differ".format(game, idx))
+
+                checked += 1
+    finally:
+        Eximo.ADD_PRUNING = pruning
+
+    return checked
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Play many Eximo games at once.')
+    parser.add_argument('games', type=int, help="Number of games played at once")
+    parser.add_argument('--policy', choices=['random', 'greedy'], default='random', help="How operations are chosen")
+    parser.add_argument('--seed', type=int, default=None, help="Seed of the random number generator")
+    parser.add_argument('--max-turns', type=int, default=500, help="Turns after which a game ends in a draw")
+    parser.add_argument('--verify', type=int, default=0, help="Number of games replayed on the scalar rules engine before the simulation")
+
+    args = parser.parse_args()
+
+    if args.verify > 0:
+        start = time.time()
+        checked = verify(args.verify, args.policy, args.seed, args.max_turns)
+        print("Verified {} steps of {} games against the scalar engine ({:.2f}s)".format(checked, args.verify, time.time() - start))
+
+    simulator = Simulator(args.games, args.policy, args.seed, args.max_turns)
+
+    start = time.time()
+    winner = simulator.run()
+    elapsed = time.time() - start
+
+    print("Games: {} ({:.2f}s, {:.0f} games/sec)".format(args.games, elapsed, args.games / elapsed))
+    print("Player 1 wins: {}".format(int((winner == 1).sum())))
+    print("Player 2 wins: {}".format(int((winner == 2).sum())))
+    print("Draws: {}".format(int((winner == 0).sum())))
+    print("Avg. turns: {:.1f}".format(simulator.turns.mean()))
+
+
+if __name__ == "__main__":
+    main()
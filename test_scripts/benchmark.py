@@ -0,0 +1,644 @@
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Eximo import *
+from Minmax import *
+from perft import perft
+from ponder import Ponder
+from MCTS import MCTS
+
+#python3 test_scripts/benchmark.py
+
+def bench_boards(depth, f=sys.stdout):
+
+    """
+    Compare the move generation speed (nodes/sec) of the board backends from the initial position
+    """
+
+    print("-- Board backends (depth = {})".format(depth), file=f)
+
+    rates = {}
+
+    for name, backend in BOARD_BACKENDS.items():
+        state = Eximo(board=backend())
+        state.perform_full_checkup()
+
+        start = time.time()
+        nodes = perft(state, depth)
+        elapsed = time.time() - start
+
+        rates[name] = nodes / elapsed
+        print("{}: {} nodes in {:.2f}s ({:.0f} nodes/sec)".format(name, nodes, elapsed, rates[name]), file=f)
+
+    print("Speedup: {:.2f}x".format(rates['bitboard'] / rates['matrix']), file=f)
+
+def bench_search(depths, eval_number=3, f=sys.stdout):
+
+    """
+    Node rate (expanded + leaf nodes per second) of a Minmax search from the initial position, for each board backend and depth
+    """
+
+    print("-- Minmax search (heuristic = {})".format(eval_number), file=f)
+
+    for name, backend in BOARD_BACKENDS.items():
+        for depth in depths:
+            state = Eximo(board=backend())
+            state.perform_full_checkup()
+
+            mm = Minmax(depth, state.curr_player, eval_number, True, False)
+            mm.move(state)
+
+            nodes = mm.expansionCount + mm.leafCount
+            print("{} depth {}: {} nodes in {:.2f}s ({:.0f} nodes/sec)".format(name, depth, nodes, mm.execTime, nodes / mm.execTime), file=f)
+
+def standard_positions(count=20, seed=0):
+
+    """
+    Standard position set of the search benchmarks: the initial position and positions reached by random games (same set for each seed)
+    """
+
+    rng = random.Random(seed)
+    positions = []
+    state = Eximo(board=BitBoard())
+    state.perform_full_checkup()
+
+    while len(positions) < count:
+        positions.append(state)
+
+        for turn in range(rng.randint(2, 6)):
+            outcomes = state.exec_all_moves(1)
+
+            if len(outcomes) == 0:
+                state = Eximo(board=BitBoard())
+                state.perform_full_checkup()
+                break
+
+            state = rng.choice(outcomes)
+
+    return positions
+
+def bench_engines(depth, eval_number=3, f=sys.stdout):
+
+    """
+    Nodes visited by each search engine over the standard position set, without move ordering and with dynamic ordering and a transposition
+    table, checking that both engines get the same root values. The savings of PVS depend on the ordering: its null windows only pay off
+    when the first move is the best one, so it may visit more nodes than minmax on some positions
+    """
+
+    print("-- Search engines (depth = {})".format(depth), file=f)
+
+    positions = standard_positions()
+    settings = [('unordered', False, {}), ('dynamic + tt', True, {'ordering': 'dynamic', 'tt_size': 16})]
+
+    for name, use_ordering, options in settings:
+        nodes = {}
+        values = {}
+        position_nodes = {}
+
+        for engine in ['minmax', 'pvs']:
+            start = time.time()
+            nodes[engine] = 0
+            values[engine] = []
+            position_nodes[engine] = []
+
+            for position in positions:
+                mm = Minmax(depth, position.curr_player, eval_number, True, use_ordering, engine=engine, **options)
+                mm.move(position.copy())
+
+                position_nodes[engine].append(mm.expansionCount + mm.leafCount)
+                values[engine].append(mm.res)
+
+            nodes[engine] = sum(position_nodes[engine])
+            print("{} {}: {} nodes in {:.2f}s".format(name, engine, nodes[engine], time.time() - start), file=f)
+
+        worse = sum(p > m for p, m in zip(position_nodes['pvs'], position_nodes['minmax']))
+
+        print("{} PVS nodes: {:.1f}% fewer, more nodes on {} of {} positions (same values: {})".format(
+            name, 100 * (1 - nodes['pvs'] / nodes['minmax']), worse, len(positions), values['pvs'] == values['minmax']), file=f)
+
+def bench_ordering(depth, eval_number=3, f=sys.stdout):
+
+    """
+    Cut statistics and time of each state ordering over the standard position set
+    """
+
+    print("-- State ordering (depth = {})".format(depth), file=f)
+
+    positions = standard_positions()
+    settings = [('none', False, {}), ('eval', True, {}), ('dynamic', True, {'ordering': 'dynamic'}),
+                ('dynamic + tt', True, {'ordering': 'dynamic', 'tt_size': 16, 'nodes': float("inf")})]
+
+    for name, use_ordering, options in settings:
+        start = time.time()
+        nodes = 0
+        cuts = 0
+        first_cuts = 0
+        cut_levels = [0] * (depth + 1)
+
+        for position in positions:
+            mm = Minmax(depth, position.curr_player, eval_number, True, use_ordering, **options)
+            mm.move(position.copy())
+
+            nodes += mm.expansionCount + mm.leafCount
+            cuts += mm.cutCount
+            first_cuts += mm.firstCutCount
+            cut_levels = [a + b for a, b in zip(cut_levels, mm.cutLevels)]
+
+        print("{}: {} nodes, {} cuts (first-move rate {:.3f}), cut levels {} in {:.2f}s".format(name, nodes, cuts, first_cuts / max(cuts, 1), cut_levels, time.time() - start), file=f)
+
+def play_game(depth, turns, eval_number=3, persistent=False, **options):
+
+    """
+    Play a computer vs computer game (without graphics) for up to the given number of turns, passing each player the value of its previous
+    move as in Game (and keeping its engine for all its moves if persistent). Returns the total nodes, aspiration re-searches and time of the
+    searches
+    """
+
+    state = Eximo(board=BitBoard())
+    state.perform_full_checkup()
+    last_values = [None, None]
+    engines = [None, None]
+    nodes = 0
+    researches = 0
+    elapsed = 0
+
+    for turn in range(turns):
+        if state.is_game_over():
+            break
+
+        player = state.curr_player
+        mm = engines[player - 1]
+        if mm is None:
+            mm = Minmax(depth, player, eval_number, True, False, **options)
+            if persistent:
+                engines[player - 1] = mm
+        state = mm.move(state, last_values[player - 1])
+        last_values[player - 1] = mm.res
+        state.perform_full_checkup()
+
+        nodes += mm.expansionCount + mm.leafCount
+        researches += mm.aspirationResearches
+        elapsed += mm.execTime
+
+        if engines[player - 1] is not mm:
+            mm.close()
+
+    for engine in engines:
+        if engine is not None:
+            engine.close()
+
+    return nodes, researches, elapsed
+
+def bench_aspiration(depth, turns=60, widths=(0, 1, 3), f=sys.stdout):
+
+    """
+    Nodes of a computer vs computer game for each aspiration window half-width (0 disables them)
+    """
+
+    print("-- Aspiration windows (depth = {}, {} turns)".format(depth, turns), file=f)
+
+    for engine in ['minmax', 'pvs']:
+        for width in widths:
+            nodes, researches, elapsed = play_game(depth, turns, engine=engine, aspiration=width)
+            print("{} width {}: {} nodes, {} re-searches in {:.2f}s".format(engine, width, nodes, researches, elapsed), file=f)
+
+def bench_persistent(depth, turns=40, f=sys.stdout):
+
+    """
+    Nodes and time of a computer vs computer game with a new engine for each move against one kept for all the moves of each player, with
+    a transposition table and iterative deepening
+    """
+
+    print("-- Persistent engine (depth = {}, {} turns)".format(depth, turns), file=f)
+
+    options = {'tt_size': 16, 'nodes': float("inf")}
+
+    for persistent in [False, True]:
+        nodes, researches, elapsed = play_game(depth, turns, persistent=persistent, **options)
+        print("{}: {} nodes in {:.2f}s".format("persistent" if persistent else "new engine per move", nodes, elapsed), file=f)
+
+def bench_frontier(depth, eval_numbers=(1, 2, 3, 4), f=sys.stdout):
+
+    """
+    Nodes, time and pruned moves/nodes of each ply with futility pruning and razoring, for each heuristic, over the standard position set
+    """
+
+    print("-- Futility pruning and razoring (depth = {})".format(depth), file=f)
+
+    settings = [('none', {}), ('futility + razoring', {'futility': True, 'razoring': True})]
+
+    for eval_number in eval_numbers:
+        for name, options in settings:
+            start = time.time()
+            nodes = 0
+            pruned_levels = [0] * (depth + 1)
+
+            for position in standard_positions():
+                mm = Minmax(depth, position.curr_player, eval_number, True, False, **options)
+                mm.move(position.copy())
+
+                nodes += mm.expansionCount + mm.leafCount
+                pruned_levels = [a + b for a, b in zip(pruned_levels, mm.prunedLevels)]
+
+            print("heuristic {} {}: {} nodes in {:.2f}s, pruned levels {}".format(eval_number, name, nodes, time.time() - start, pruned_levels), file=f)
+
+def bench_parallel(depths, workers=None, positions=3, eval_number=3, f=sys.stdout):
+
+    """
+    Time and speedup of the root-parallel search for each number of worker processes (1, 2, 4, ... up to the number of CPUs by default), over
+    the first positions of the standard set, checking that the chosen moves and values are those of the sequential search
+    """
+
+    if workers is None:
+        workers = [1]
+        while workers[-1] * 2 <= (os.cpu_count() or 1):
+            workers.append(workers[-1] * 2)
+
+    for depth in depths:
+        print("-- Root-parallel search (depth = {}, {} CPUs)".format(depth, os.cpu_count()), file=f)
+
+        results = None
+        sequential_time = None
+
+        for count in workers:
+            start = time.time()
+            outcomes = []
+
+            for position in standard_positions()[:positions]:
+                mm = Minmax(depth, position.curr_player, eval_number, True, False, workers=count)
+                state = mm.move(position.copy())
+                state.perform_full_checkup()
+
+                outcomes.append((mm.res, state.get_key()))
+
+            elapsed = time.time() - start
+
+            if results is None:
+                results = outcomes
+                sequential_time = elapsed
+
+            print("{} workers: {:.2f}s, speedup {:.2f} (same moves and values: {})".format(count, elapsed, sequential_time / elapsed, outcomes == results), file=f)
+
+def bench_smp(time_ms=1000, workers=(1, 2, 4, 8, 16, 32), positions=3, depth=12, eval_number=3, f=sys.stdout):
+
+    """
+    Nodes/sec (of all the processes) and depth reached by Lazy SMP with a time budget for each number of workers, over the first positions
+    of the standard set
+    """
+
+    print("-- Lazy SMP ({} ms per move, {} CPUs)".format(time_ms, os.cpu_count()), file=f)
+
+    single_rate = None
+
+    for count in workers:
+        nodes = 0
+        elapsed = 0
+        depths = []
+
+        for position in standard_positions()[:positions]:
+            mm = Minmax(depth, position.curr_player, eval_number, True, True, ordering='dynamic', tt_size=16, time_ms=time_ms,
+                        workers=count, parallel='smp')
+            mm.move(position.copy())
+
+            nodes += mm.expansionCount + mm.leafCount
+            elapsed += mm.execTime
+            depths.append(mm.depthReached)
+            mm.close()
+
+        rate = nodes / elapsed
+        if single_rate is None:
+            single_rate = rate
+
+        print("{} workers: {:.0f} nodes/sec ({:.2f}x), depths reached {}".format(count, rate, rate / single_rate, depths), file=f)
+
+def bench_ybwc(depths, workers=4, positions=3, eval_number=3, f=sys.stdout):
+
+    """
+    Time, nodes and wasted speculative nodes of the Young Brothers Wait search against the sequential one, over the first positions of the
+    standard set, checking that the values are the same
+    """
+
+    for depth in depths:
+        print("-- Young Brothers Wait (depth = {}, {} workers, {} CPUs)".format(depth, workers, os.cpu_count()), file=f)
+
+        values = {}
+
+        for name, options in [('sequential', {}), ('ybwc', {'workers': workers, 'parallel': 'ybwc'})]:
+            start = time.time()
+            nodes = 0
+            speculative = 0
+            wasted = 0
+            values[name] = []
+
+            for position in standard_positions()[:positions]:
+                mm = Minmax(depth, position.curr_player, eval_number, True, False, **options)
+                mm.move(position.copy())
+
+                nodes += mm.expansionCount + mm.leafCount
+                speculative += mm.speculativeCount
+                wasted += mm.wastedCount
+                values[name].append(mm.res)
+
+            print("{}: {} nodes in {:.2f}s, {} speculative ({} wasted)".format(name, nodes, time.time() - start, speculative, wasted), file=f)
+
+        print("Same values: {}".format(values['ybwc'] == values['sequential']), file=f)
+
+def bench_ponder(depth, think_ms=2000, positions=4, eval_number=3, seed=0, f=sys.stdout):
+
+    """
+    Time of the computer's second move with and without pondering, when the opponent takes think_ms to play the predicted reply or a random
+    one, from the first positions of the standard set (with more than one move)
+    """
+
+    print("-- Pondering (depth = {}, opponent thinks {} ms)".format(depth, think_ms), file=f)
+
+    rand = random.Random(seed)
+    starts = [position for position in standard_positions() if len(position.copy().generate_moves()) > 1][:positions]
+
+    for reply_type in ['predicted', 'random']:
+        times = {'no ponder': 0, 'ponder': 0}
+
+        for position in starts:
+            mm = Minmax(depth, position.curr_player, eval_number, True, True, ordering='dynamic')
+            ponder = Ponder(mm.worker_settings())
+            mm.tt = ponder.table
+
+            state = mm.move(position.copy())
+            ponder.start(state)
+            time.sleep(think_ms / 1000)
+
+            # Opponent's reply
+            replies = state.generate_moves()
+            if reply_type == 'predicted' and ponder.predicted in replies:
+                reply = ponder.predicted
+            else:
+                reply = rand.choice(replies)
+            state = state.apply(reply)
+            state.perform_full_checkup()
+
+            ponder.finish(state)
+
+            for name in times:
+                mm = Minmax(depth, position.curr_player, eval_number, True, True, ordering='dynamic', tt_size=16)
+                if name == 'ponder':
+                    mm.tt = ponder.table
+
+                mm.move(state.copy())
+                times[name] += mm.execTime
+
+            ponder.close()
+
+        print("{} reply: {:.3f}s without pondering, {:.3f}s with pondering".format(reply_type, times['no ponder'] / len(starts), times['ponder'] / len(starts)), file=f)
+
+def bench_mcts(iterations=400, workers=(1, 2), positions=3, eval_number=3, f=sys.stdout):
+
+    """
+    Playouts/sec of each MCTS playout policy and number of workers over the first positions of the standard set (with more than one move)
+    """
+
+    print("-- Monte Carlo Tree Search ({} iterations, {} CPUs)".format(iterations, os.cpu_count()), file=f)
+
+    starts = [position for position in standard_positions() if len(position.copy().exec_all_moves(1)) > 1][:positions]
+
+    for playout in ['random', 'heuristic']:
+        for count in workers:
+            playouts = 0
+            elapsed = 0
+            depth = 0
+
+            for position in starts:
+                mcts = MCTS(position.curr_player, eval_number, iterations=iterations, playout=playout, workers=count, seed=0)
+                mcts.move(position.copy())
+
+                playouts += mcts.playoutCount
+                elapsed += mcts.execTime
+                depth = max(depth, mcts.treeDepth)
+
+            print("{} playouts, {} workers: {:.0f} playouts/sec, tree depth {}".format(playout, count, playouts / elapsed, depth), file=f)
+
+def bench_selective(depth, selective_depth, positions=6, eval_number=3, f=sys.stdout):
+
+    """
+    Time of a full-width search against a selective one (null-move pruning and late-move reductions, with dynamic ordering, transposition
+    table and iterative deepening) to a greater depth, over the first positions of the standard set
+    """
+
+    print("-- Selective search (depth {} full-width vs depth {} selective)".format(depth, selective_depth), file=f)
+
+    selective = {'ordering': 'dynamic', 'tt_size': 16, 'nodes': float("inf"), 'null_move': True, 'lmr': True}
+    settings = [('full-width', depth, False, {}), ('selective', selective_depth, True, selective)]
+
+    for name, search_depth, use_ordering, options in settings:
+        start = time.time()
+        nodes = 0
+        null_cuts = 0
+        reductions = 0
+
+        for position in standard_positions()[:positions]:
+            mm = Minmax(search_depth, position.curr_player, eval_number, True, use_ordering, **options)
+            mm.move(position.copy())
+
+            nodes += mm.expansionCount + mm.leafCount
+            null_cuts += mm.nullCutCount
+            reductions += mm.lmrCount
+
+        print("{} depth {}: {} nodes, {} null-move cuts, {} reductions in {:.2f}s".format(name, search_depth, nodes, null_cuts, reductions, time.time() - start), file=f)
+
+def play_match(settings_a, settings_b, games=10, turns=150, eval_number=3, seed=0):
+
+    """
+    Play games between two computer settings ((depth, Minmax keyword arguments) pairs), alternating who starts. Each game starts with two
+    random turns so the games differ. Returns the wins of a, wins of b, draws (turn limit) and the search time of each setting
+    """
+
+    rng = random.Random(seed)
+    wins = [0, 0]
+    draws = 0
+    times = [0, 0]
+
+    for game in range(games):
+        state = Eximo(board=BitBoard())
+        state.perform_full_checkup()
+
+        for turn in range(2):
+            state = rng.choice(state.exec_all_moves(1))
+            state.perform_full_checkup()
+
+        # Setting of each player (a is player 1 in even games)
+        players = [0, 1] if game % 2 == 0 else [1, 0]
+        settings = [settings_a, settings_b]
+
+        for turn in range(turns):
+            if state.is_game_over():
+                wins[players[state.get_enemy(state.curr_player) - 1]] += 1
+                break
+
+            side = players[state.curr_player - 1]
+            depth, options = settings[side]
+
+            mm = Minmax(depth, state.curr_player, eval_number, True, False, **options)
+            state = mm.move(state)
+            state.perform_full_checkup()
+            times[side] += mm.execTime
+        else:
+            draws += 1
+
+    return wins[0], wins[1], draws, times
+
+def bench_quiescence(depth, games=10, f=sys.stdout):
+
+    """
+    Match between a search of the given depth with quiescence and a search one level deeper without it
+    """
+
+    print("-- Quiescence (depth {} + quiescence vs depth {}, {} games)".format(depth, depth + 1, games), file=f)
+
+    wins_a, wins_b, draws, times = play_match((depth, {'quiescence': True}), (depth + 1, {}), games)
+
+    print("Wins: {} - {} ({} draws)".format(wins_a, wins_b, draws), file=f)
+    print("Time: {:.2f}s - {:.2f}s".format(times[0], times[1]), file=f)
+
+def bench_tt(depth, sizes=(0, 16), eval_number=3, f=sys.stdout):
+
+    """
+    Nodes and time of a Minmax search from the initial position for each transposition table size (in MB, 0 disables it)
+    """
+
+    print("-- Transposition table (depth = {})".format(depth), file=f)
+
+    for size in sizes:
+        state = Eximo(board=BitBoard())
+        state.perform_full_checkup()
+
+        mm = Minmax(depth, state.curr_player, eval_number, True, False, tt_size=size)
+        mm.move(state)
+
+        nodes = mm.expansionCount + mm.leafCount
+        print("{} MB: {} nodes in {:.2f}s (value = {})".format(size, nodes, mm.execTime, mm.res), file=f)
+
+        if mm.tt is not None:
+            mm.tt.print_stats(f)
+
+def add_piece_states(games, seed=0):
+
+    """
+    ADDPIECE_2 states reached (after a single operation) in random games
+    """
+
+    rng = random.Random(seed)
+    result = []
+
+    for game in range(games):
+        state = Eximo(board=BitBoard())
+        state.perform_full_checkup()
+
+        while True:
+            for operation in state.operations():
+                new_state = state.copy()
+                new_state.make_move(operation)
+
+                if new_state.next_move == Eximo.ADDPIECE_2:
+                    result.append(new_state)
+
+            outcomes = state.exec_all_moves(1)
+
+            if len(outcomes) == 0:
+                break
+
+            state = rng.choice(outcomes)
+
+    return result
+
+def bench_add_pieces(games=50, depth=3, positions=40, eval_number=3, f=sys.stdout):
+
+    """
+    Average branching factor of the add-piece states for each pruning setting, and root values of searches over the standard position set
+    and the first add-piece states, checking them against the ones without pruning (only 'mirror' should keep them all)
+    """
+
+    print("-- Add-piece branching factor ({} random games)".format(games), file=f)
+
+    states = add_piece_states(games)
+    roots = standard_positions() + states[:positions]
+    pruning = Eximo.ADD_PRUNING
+    values = {}
+
+    for mode in ['none', 'mirror', 'back_row', 'all']:
+        Eximo.ADD_PRUNING = mode
+        placements = sum(len(list(state.iter_add_placements())) for state in states)
+
+        values[mode] = []
+        for root in roots:
+            mm = Minmax(depth, root.curr_player, eval_number, True, False)
+            mm.move(root.copy())
+            values[mode].append(mm.res)
+
+        changed = sum(a != b for a, b in zip(values[mode], values['none']))
+        print("{}: {:.2f} placements per node ({} nodes), root values changed on {} of {} positions (depth {})".format(
+            mode, placements / len(states), len(states), changed, len(roots), depth), file=f)
+
+    Eximo.ADD_PRUNING = pruning
+
+def bench_memory(positions=200, seed=0, f=sys.stdout):
+
+    """
+    Memory used by each stored successor state (state and board), measured with tracemalloc over the successors of positions taken from a
+    random game
+    """
+
+    print("-- Memory per node", file=f)
+
+    for name, backend in BOARD_BACKENDS.items():
+        rng = random.Random(seed)
+        state = Eximo(board=backend())
+        state.perform_full_checkup()
+        roots = []
+
+        while len(roots) < positions:
+            roots.append(state)
+            outcomes = state.exec_all_moves(1)
+
+            if len(outcomes) == 0:
+                state = Eximo(board=backend())
+                state.perform_full_checkup()
+            else:
+                state = rng.choice(outcomes)
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        nodes = [outcome for root in roots for outcome in root.exec_all_moves(1)]
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        print("{}: {:.0f} bytes per node ({} nodes)".format(name, used / len(nodes), len(nodes)), file=f)
+
+def main():
+
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+    bench_boards(depth)
+    bench_search([3, 4, 5])
+    bench_tt(5)
+    bench_engines(4)
+    bench_ordering(4)
+    bench_aspiration(4)
+    bench_quiescence(2)
+    bench_selective(5, 7)
+    bench_frontier(4)
+    bench_parallel([4, 5, 6])
+    bench_smp()
+    bench_ybwc([4, 5])
+    bench_ponder(5)
+    bench_persistent(4)
+    bench_mcts()
+    bench_add_pieces()
+    bench_memory()
+
+
+if __name__ == "__main__":
+    main()
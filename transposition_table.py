@@ -0,0 +1,254 @@
+import struct
+import sys
+from multiprocessing import shared_memory
+
+'''
+
+TranspositionTable class
+
+. Stores the result of searching a position, indexed by its zobrist key (Eximo.get_key): value, depth searched, bound type and best move.
+. The bound type tells how the value relates to the real minimax value: EXACT if the value was inside the alpha-beta window, LOWER if the
+search was cut because the value reached beta (max nodes) and UPPER if it was cut because the value reached alpha (min nodes), or if no
+move could raise the value above alpha.
+. The memory budget is fixed when the table is created: it has one bucket per ENTRY_SIZE * 2 bytes of the budget, and each bucket has two
+entries. The first one keeps the deepest search of the positions that map to the bucket, the second one always keeps the most recent one.
+. The table may be kept across the moves of a game. Each search is a new generation: entries stored by earlier searches are still used
+(the positions below the move played are searched again), but the deepest entry of a bucket is only kept against newer ones if it is from
+the current search.
+
+'''
+
+class TranspositionTable():
+
+    # Bound types
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    # Approximate memory used by one entry (the tuple and its key, value and move), in bytes
+    ENTRY_SIZE = 200
+
+    def __init__(self, size_mb=16):
+        self.buckets = max(1, int(size_mb * 1024 * 1024) // (2 * self.ENTRY_SIZE))
+
+        # Entries are (key, value, depth, bound, best move, generation) tuples
+        self.deep = [None] * self.buckets       # Depth-preferred entries
+        self.recent = [None] * self.buckets     # Always-replace entries
+        self.generation = 0
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0
+        self.collisions = 0                     # Probes that found the bucket taken by other positions
+        self.stores = 0
+        self.reused = 0                         # Hits on entries stored by earlier searches
+
+    def new_search(self):
+        """
+            Start a new generation (the entries stored from now on belong to the next search), with new statistics
+        """
+        self.generation += 1
+        self.reset_stats()
+
+    def lookup(self, key):
+        """
+            Entry stored for the key, None if there is none
+        """
+        self.probes += 1
+        idx = key % self.buckets
+        deep = self.deep[idx]
+        recent = self.recent[idx]
+
+        if deep is not None and deep[0] == key:
+            self.hits += 1
+            self.reused += deep[5] != self.generation
+            return deep
+
+        if recent is not None and recent[0] == key:
+            self.hits += 1
+            self.reused += recent[5] != self.generation
+            return recent
+
+        if deep is not None or recent is not None:
+            self.collisions += 1
+
+        return None
+
+    def put(self, key, value, depth, bound, move):
+        """
+            Store the result of searching the position with the given key to the given depth
+        """
+        self.stores += 1
+        idx = key % self.buckets
+        entry = (key, value, depth, bound, move, self.generation)
+        deep = self.deep[idx]
+
+        if deep is None or deep[0] == key or deep[5] != self.generation or depth >= deep[2]:
+            self.deep[idx] = entry
+        else:
+            self.recent[idx] = entry
+
+    def cutoff_value(self, entry, depth, alpha, beta):
+        """
+            Value that ends the search of a node with the given depth and window using the entry, None if the entry can't end it
+        """
+        value = entry[1]
+        bound = entry[3]
+
+        if entry[2] < depth:
+            return None
+
+        if bound == self.EXACT or (bound == self.LOWER and value >= beta) or (bound == self.UPPER and value <= alpha):
+            self.cutoffs += 1
+            return value
+
+        return None
+
+    def clear(self):
+        self.deep = [None] * self.buckets
+        self.recent = [None] * self.buckets
+
+    def print_stats(self, f=sys.stdout):
+
+        probes = max(self.probes, 1)
+
+        print("TT probes: " + str(self.probes) + " (" + str(self.buckets) + " buckets)", file=f)
+        print("TT hit rate: " + str(self.hits / probes), file=f)
+        print("TT cutoff rate: " + str(self.cutoffs / probes), file=f)
+        print("TT collision rate: " + str(self.collisions / probes), file=f)
+        if self.reused > 0:
+            print("TT hits on entries of earlier searches: " + str(self.reused), file=f)
+
+
+'''
+
+SharedTranspositionTable class
+
+. Transposition table held in shared memory, so the processes of a parallel search (Lazy SMP) can all use the same one. It has the same
+buckets and replacement scheme as TranspositionTable, in a packed array of 16-byte entries of two 64-bit words:
+    - word 0: check (32 bits) | depth (8 bits) | bound + 1 (2 bits, 0 for an empty entry) | generation (9 bits) | best move (13 bits)
+    - word 1: value (IEEE double)
+. The current generation (modulo 512) is kept after the entries, so every process stores its entries with the same one.
+. The check is the upper half of the key, xored with both halves of word 1. Entries are written and read without locks: an entry that is
+torn by a concurrent write (word 0 of one entry with word 1 of another) fails the check and is taken as a miss.
+. Only plain moves ((from, to) pairs) are stored as best moves, since they fit in 13 bits (flag bit and two 6-bit tiles).
+. The table is created by one process and attached to by name in the others (including when it is pickled). The creator must release it.
+
+'''
+
+class SharedTranspositionTable(TranspositionTable):
+
+    ENTRY_SIZE = 16
+    GENERATIONS = 512
+
+    def __init__(self, size_mb=16, name=None):
+        self.size_mb = size_mb
+        self.buckets = max(1, int(size_mb * 1024 * 1024) // (2 * self.ENTRY_SIZE))
+
+        # Entry 2 * i is the depth-preferred entry of bucket i, entry 2 * i + 1 is the always-replace one
+        self.header = 2 * self.buckets * self.ENTRY_SIZE
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.header + 8)
+            self.shm.buf[:] = bytes(self.shm.size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+
+        # Statistics (of this process)
+        self.reset_stats()
+
+    def __reduce__(self):
+        return (SharedTranspositionTable, (self.size_mb, self.shm.name))
+
+    @property
+    def generation(self):
+        return struct.unpack_from('<Q', self.shm.buf, self.header)[0]
+
+    def new_search(self):
+        """
+            Start a new generation (the entries stored from now on belong to the next search), with new statistics
+        """
+        struct.pack_into('<Q', self.shm.buf, self.header, (self.generation + 1) % self.GENERATIONS)
+        self.reset_stats()
+
+    def read(self, slot, key):
+        """
+            Entry in the slot if it belongs to the key (None if it is empty, torn or another position's), and True if the slot is taken
+        """
+        word0, word1 = struct.unpack_from('<QQ', self.shm.buf, slot * self.ENTRY_SIZE)
+        bound = (word0 >> 22) & 3
+
+        if bound == 0:
+            return None, False
+
+        if (word0 >> 32) ^ (word1 >> 32) ^ (word1 & 0xFFFFFFFF) != key >> 32:
+            return None, True
+
+        move = word0 & 0x1FFF
+        move = ((move >> 6) & 63, move & 63) if move else None
+        value = struct.unpack('<d', struct.pack('<Q', word1))[0]
+
+        return (key, value, (word0 >> 24) & 255, bound - 1, move, (word0 >> 13) & 511), True
+
+    def lookup(self, key):
+        """
+            Entry stored for the key, None if there is none
+        """
+        self.probes += 1
+        idx = key % self.buckets
+
+        deep, deep_taken = self.read(2 * idx, key)
+        if deep is not None:
+            self.hits += 1
+            self.reused += deep[5] != self.generation
+            return deep
+
+        recent, recent_taken = self.read(2 * idx + 1, key)
+        if recent is not None:
+            self.hits += 1
+            self.reused += recent[5] != self.generation
+            return recent
+
+        if deep_taken or recent_taken:
+            self.collisions += 1
+
+        return None
+
+    def put(self, key, value, depth, bound, move):
+        """
+            Store the result of searching the position with the given key to the given depth
+        """
+        self.stores += 1
+        idx = key % self.buckets
+        depth = min(max(depth, 0), 255)
+
+        move = (1 << 12) | (move[0] << 6) | move[1] if move is not None and len(move) == 2 else 0
+        word1 = struct.unpack('<Q', struct.pack('<d', value))[0]
+        check = (key >> 32) ^ (word1 >> 32) ^ (word1 & 0xFFFFFFFF)
+        generation = self.generation
+        word0 = (check << 32) | (depth << 24) | ((bound + 1) << 22) | (generation << 13) | move
+
+        # Depth-preferred entry, unless it keeps a deeper search of another position from the current search
+        slot = 2 * idx
+        deep, deep_taken = self.read(slot, key)
+        if deep_taken and deep is None:
+            stored = struct.unpack_from('<Q', self.shm.buf, slot * self.ENTRY_SIZE)[0]
+            if (stored >> 13) & 511 == generation and depth < (stored >> 24) & 255:
+                slot += 1
+
+        struct.pack_into('<QQ', self.shm.buf, slot * self.ENTRY_SIZE, word0, word1)
+
+    def clear(self):
+        self.shm.buf[:self.header] = bytes(self.header)
+
+    def release(self):
+        """
+            Detach from the shared memory, and free it if this process created it
+        """
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,76 @@
+import random
+
+'''
+
+Zobrist hashing
+
+. Every position has a 64-bit key: the XOR of a random number for each (tile, player) pair occupied by a piece, so boards can update their
+key incrementally when a piece is set or removed (see Board.set_element/remove_element and BitBoard).
+. Eximo.get_key adds the parts for the player to move, the gamestate flag and the pending tiles of jump/capture/add-piece states.
+. The numbers are generated from a fixed seed, so keys are the same across processes and runs.
+
+'''
+
+ZOBRIST_SEED = 0x45584D4F
+
+FULL = (1 << 64) - 1
+
+# Odd multiplier used to mix the bitmask of the pending tiles into the key (a bitmask of any size is hashed in O(1))
+PENDING_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+class Singleton(type):
+    """
+    Define an Instance operation that lets clients access its unique
+    instance.
+    """
+
+    def __init__(cls, name, bases, attrs, **kwargs):
+        super().__init__(name, bases, attrs)
+        cls._instance = None
+
+    def __call__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__call__(*args, **kwargs)
+        return cls._instance
+
+
+class ZobristTable(metaclass=Singleton):
+    def __init__(self, seed=ZOBRIST_SEED):
+        rng = random.Random(seed)
+
+        # Indexed by player number (position 0 is unused) and bit index ((row - 1) * 8 + column - 1)
+        self.pieces = [None] + [[rng.getrandbits(64) for idx in range(64)] for player in (1, 2)]
+
+        # Indexed by player number and by gamestate flag
+        self.players = [0] + [rng.getrandbits(64) for player in (1, 2)]
+        self.flags = [rng.getrandbits(64) for flag in range(5)]
+
+    def get(self, column, row, piece):
+        return self.pieces[piece][(row - 1) * 8 + column - 1]
+
+    def pending(self, mask):
+        """
+            Key part of the pending tiles of a state
+        """
+        return (mask * PENDING_MULTIPLIER) & FULL
+
+    def board_key(self, masks):
+        """
+            Key of the pieces of both players, given their bitmasks (indexed by player number)
+        """
+        key = 0
+
+        for player in (1, 2):
+            mask = masks[player]
+
+            while mask:
+                low = mask & -mask
+                key ^= self.pieces[player][low.bit_length() - 1]
+                mask ^= low
+
+        return key
+
+
+ZOBRIST = ZobristTable()
+PIECE_KEYS = ZOBRIST.pieces